@@ -0,0 +1,297 @@
+# 동시에 들어온 요청들을 하나의 패딩된 배치로 묶어 디코딩하는 스케줄러
+# 모델은 워커 스레드 하나에서만 실행되고, 요청은 디코딩 스텝 사이에 배치에 합류함(continuous batching).
+# 새로 합류한 요청만 prefill하여 그 KV 캐시를 생성 중인 배치의 캐시에 이어 붙이므로, 이미 생성 중인 시퀀스는 다시 계산하지 않음.
+# 끝난 시퀀스는 KV 캐시에서 바로 제외하므로 짧은 응답이 긴 응답을 기다리지 않음.
+
+import queue
+import asyncio
+from threading import Thread
+
+import torch
+import torch.nn.functional as F
+from transformers import DynamicCache
+
+class BatchSequence():
+    ''' 스케줄러에 제출된 요청 하나. 워커 스레드가 만든 텍스트 조각을 이벤트 루프의 큐로 전달함. '''
+    def __init__(self, promptIds, maxNewTokens, temperature, loop):
+        self.promptIds = list(promptIds)
+        self.generatedIds = []
+        self.maxNewTokens = max(1, maxNewTokens)
+        self.temperature = temperature
+        self.finishReason = None    # 'stop' | 'length' | 'cancelled' | 'error'
+        self.cancelled = False
+        self.emittedText = ''
+        self.loop = loop
+        self.deltaQueue = asyncio.Queue()
+
+    def cancel(self):
+        self.cancelled = True   # 워커가 다음 스텝에서 배치에서 제외함
+
+    def put(self, item):
+        ''' 워커 스레드에서 호출. '''
+        self.loop.call_soon_threadsafe(self.deltaQueue.put_nowait, item)
+
+    async def stream(self):
+        '''output: (async iterator) 새로 생성된 텍스트 조각. 끝나면 self.finishReason이 설정됨.'''
+        try:
+            while True:
+                item = await self.deltaQueue.get()
+
+                if item is None:
+                    break
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            if self.finishReason is None:
+                self.cancel()   # 클라이언트 연결 종료 등으로 소비가 중단됨
+
+class BatchScheduler():
+    def __init__(self, model, tokenizer, maxBatchSize=8):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.maxBatchSize = maxBatchSize
+        self.pendingQueue = queue.Queue()
+        self.worker = None
+        self.running = False
+
+        # 모델에 따라 eos 토큰이 여러 개일 수 있음(generation_config.eos_token_id가 리스트)
+        self.eosTokenIds = set()
+        for eosTokenId in (tokenizer.eos_token_id, model.generation_config.eos_token_id):
+            if eosTokenId is None:
+                continue
+            elif isinstance(eosTokenId, int):
+                self.eosTokenIds.add(eosTokenId)
+            else:
+                self.eosTokenIds.update(eosTokenId)
+
+        # 패딩 위치는 attention mask로 가려지므로 값 자체는 상관없음
+        self.padTokenId = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else min(self.eosTokenIds, default=0)
+
+        self.stats = {"steps": 0, "prefills": 0, "prefill_tokens": 0, "max_batch_size": 0, "generated_tokens": 0, "completed": 0}
+
+    def start(self):
+        self.running = True
+        self.worker = Thread(target=self.__run, daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        self.running = False
+        self.pendingQueue.put(None)     # 대기 중인 워커를 깨움
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+        # 배치에 합류하지 못한 요청도 끝내서 stream()을 기다리는 쪽이 멈춰 있지 않도록 함
+        while True:
+            try:
+                seq = self.pendingQueue.get_nowait()
+            except queue.Empty:
+                break
+
+            if seq is not None:
+                self.__finish(seq, 'cancelled')
+
+    def submit(self, promptIds, maxNewTokens=256, temperature=None):
+        '''input: 토큰화된 프롬프트. 이벤트 루프 위에서 호출.
+        output: BatchSequence. async for로 seq.stream()을 소비.'''
+
+        if not self.running:
+            raise RuntimeError('BatchScheduler is not running.')
+
+        seq = BatchSequence(promptIds, maxNewTokens, temperature, asyncio.get_running_loop())
+        self.pendingQueue.put(seq)
+
+        return seq
+
+    def __admit(self, active):
+        ''' 배치에 여유가 있으면 대기 중인 요청을 active 끝에 합류시키고 합류한 수를 반환. 처리 중인 요청이 없으면 새 요청을 기다림. '''
+        admitted = 0
+
+        while self.running and len(active) < self.maxBatchSize:
+            try:
+                seq = self.pendingQueue.get(block=not active)
+            except queue.Empty:
+                break
+
+            if seq is None:     # stop()
+                break
+            elif seq.cancelled:
+                self.__finish(seq, 'cancelled')
+            else:
+                active.append(seq)
+                admitted = admitted + 1
+
+        return admitted
+
+    def __prefill(self, seqs):
+        ''' 시퀀스들(프롬프트 + 지금까지 생성된 토큰)을 왼쪽 패딩하여 한 번에 계산하고 KV 캐시를 새로 만듦. '''
+        seqIds = [seq.promptIds + seq.generatedIds for seq in seqs]
+        maxLength = max(len(ids) for ids in seqIds)
+
+        inputIds = torch.full((len(seqIds), maxLength), self.padTokenId, dtype=torch.long)
+        attentionMask = torch.zeros((len(seqIds), maxLength), dtype=torch.long)
+
+        for i, ids in enumerate(seqIds):
+            inputIds[i, maxLength - len(ids):] = torch.tensor(ids, dtype=torch.long)
+            attentionMask[i, maxLength - len(ids):] = 1
+
+        inputIds = inputIds.to(self.model.device)
+        attentionMask = attentionMask.to(self.model.device)
+        positionIds = (attentionMask.cumsum(-1) - 1).clamp(min=0)   # 왼쪽 패딩을 건너뛴 위치
+
+        modelOutput = self.model(
+            input_ids=inputIds
+            , attention_mask=attentionMask
+            , position_ids=positionIds
+            , use_cache=True
+        )
+        self.stats["prefills"] = self.stats["prefills"] + 1
+        self.stats["prefill_tokens"] = self.stats["prefill_tokens"] + sum(len(ids) for ids in seqIds)
+
+        return modelOutput.logits[:, -1, :], modelOutput.past_key_values, attentionMask
+
+    def __decode(self, nextTokens, pastKeyValues, attentionMask):
+        ''' 직전에 생성된 토큰 하나씩만 입력하여 한 스텝 진행. '''
+        attentionMask = torch.cat([attentionMask, attentionMask.new_ones((attentionMask.shape[0], 1))], dim=-1)
+        positionIds = attentionMask.sum(-1, keepdim=True) - 1
+
+        modelOutput = self.model(
+            input_ids=nextTokens[:, None]
+            , attention_mask=attentionMask
+            , position_ids=positionIds
+            , past_key_values=pastKeyValues
+            , use_cache=True
+        )
+
+        return modelOutput.logits[:, -1, :], modelOutput.past_key_values, attentionMask
+
+    def __mergeCaches(self, pastKeyValues, attentionMask, newPastKeyValues, newAttentionMask):
+        ''' 생성 중인 배치의 KV 캐시 뒤에 새로 prefill한 시퀀스의 KV 캐시를 배치 방향으로 이어 붙임.
+        길이가 짧은 쪽은 왼쪽에 패딩하고 attention mask로 가림. '''
+        length = max(attentionMask.shape[1], newAttentionMask.shape[1])
+
+        def padStates(states):
+            return F.pad(states, (0, 0, length - states.shape[2], 0))   # (batch, heads, length, headDim)
+
+        mergedCache = []
+        for (keys, values), (newKeys, newValues) in zip(pastKeyValues.to_legacy_cache(), newPastKeyValues.to_legacy_cache()):
+            mergedCache.append((
+                torch.cat([padStates(keys), padStates(newKeys)], dim=0)
+                , torch.cat([padStates(values), padStates(newValues)], dim=0)
+            ))
+
+        mergedMask = torch.cat([
+            F.pad(attentionMask, (length - attentionMask.shape[1], 0))
+            , F.pad(newAttentionMask, (length - newAttentionMask.shape[1], 0))
+        ], dim=0)
+
+        return DynamicCache.from_legacy_cache(tuple(mergedCache)), mergedMask
+
+    def __sample(self, active, logits):
+        ''' temperature가 없으면 greedy, 있으면 시퀀스별로 샘플링. '''
+        logits = logits.float()
+        nextTokens = logits.argmax(dim=-1)
+
+        for i, seq in enumerate(active):
+            if seq.temperature:
+                probs = torch.softmax(logits[i] / seq.temperature, dim=-1)
+                nextTokens[i] = torch.multinomial(probs, 1)[0]
+
+        return nextTokens
+
+    def __emitDelta(self, seq, final=False):
+        text = self.tokenizer.decode(seq.generatedIds, skip_special_tokens=True)
+
+        if text.endswith('\ufffd') and not final:
+            return  # 멀티바이트 문자(한글 등)가 아직 완성되지 않음
+
+        delta = text[len(seq.emittedText):]
+        if delta:
+            seq.emittedText = text
+            seq.put(delta)
+
+    def __finish(self, seq, finishReason, error=None):
+        if finishReason != 'cancelled':
+            self.__emitDelta(seq, final=True)
+
+        seq.finishReason = finishReason
+        self.stats["completed"] = self.stats["completed"] + 1
+
+        if error is not None:
+            seq.put(error)
+        seq.put(None)
+
+    def __run(self):
+        active = []
+        nextTokens = None
+        pastKeyValues = None
+        attentionMask = None
+
+        self.model.eval()
+
+        with torch.inference_mode():
+            while self.running:
+                admitted = self.__admit(active)
+                if not active:
+                    continue
+
+                try:
+                    if pastKeyValues is None or (admitted and not isinstance(pastKeyValues, DynamicCache)):
+                        # 생성 중인 배치가 없거나 캐시를 이어 붙일 수 없는 형식이면 배치 전체를 prefill함
+                        logits, pastKeyValues, attentionMask = self.__prefill(active)
+                    else:
+                        # 생성 중인 시퀀스는 한 스텝 디코딩하고, 새로 합류한 시퀀스만 prefill하여 캐시를 합침
+                        logits, pastKeyValues, attentionMask = self.__decode(nextTokens, pastKeyValues, attentionMask)
+
+                        if admitted:
+                            newSeqs = active[len(active) - admitted:]
+                            newLogits, newPastKeyValues, newAttentionMask = self.__prefill(newSeqs)
+                            pastKeyValues, attentionMask = self.__mergeCaches(pastKeyValues, attentionMask, newPastKeyValues, newAttentionMask)
+                            logits = torch.cat([logits, newLogits], dim=0)
+                except Exception as e:
+                    print('batch_scheduler.py.BatchScheduler.__run().error:', e)
+                    for seq in active:
+                        self.__finish(seq, 'error', e)
+                    active = []
+                    pastKeyValues = None
+                    continue
+
+                self.stats["steps"] = self.stats["steps"] + 1
+                self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(active))
+
+                nextTokens = self.__sample(active, logits)
+                keep = []
+
+                for i, seq in enumerate(active):
+                    tokenId = nextTokens[i].item()
+
+                    if seq.cancelled:
+                        self.__finish(seq, 'cancelled')
+                    elif tokenId in self.eosTokenIds:
+                        self.__finish(seq, 'stop')
+                    else:
+                        seq.generatedIds.append(tokenId)
+                        self.stats["generated_tokens"] = self.stats["generated_tokens"] + 1
+
+                        if len(seq.generatedIds) >= seq.maxNewTokens:
+                            self.__finish(seq, 'length')
+                        else:
+                            self.__emitDelta(seq)
+                            keep.append(i)
+
+                if len(keep) < len(active):
+                    active = [active[i] for i in keep]
+
+                    if active and hasattr(pastKeyValues, 'batch_select_indices'):
+                        # 끝난 시퀀스를 KV 캐시에서 제외
+                        keepIndices = torch.tensor(keep, device=nextTokens.device)
+                        pastKeyValues.batch_select_indices(keepIndices)
+                        attentionMask = attentionMask[keepIndices]
+                        nextTokens = nextTokens[keepIndices]
+                    else:
+                        pastKeyValues = None    # 다음 스텝에서 남은 시퀀스로 다시 prefill
+
+            for seq in active:
+                self.__finish(seq, 'cancelled')
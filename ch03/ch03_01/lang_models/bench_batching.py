@@ -0,0 +1,104 @@
+# 요청을 하나씩 처리(model.generate)할 때와 BatchScheduler로 묶어 처리할 때의 전체 처리량(tokens/s) 비교
+# 두 경로 모두 greedy 디코딩, 같은 프롬프트 집합, 같은 max_new_tokens를 사용합니다.
+# 배치 처리는 요청이 한꺼번에 도착하는 경우(burst)와 --arrival-interval 간격으로 도착하여 디코딩 중간에
+# 배치에 합류하는 경우(staggered)를 함께 측정합니다. prefill_tokens는 prefill로 계산한 토큰 수입니다.
+#
+# 실행: lang_models 디렉터리에서 (CPU에서 작은 모델로)
+# python bench_batching.py --model HuggingFaceTB/SmolLM2-135M-Instruct --requests 16 --max-new-tokens 64 --max-batch-size 8
+
+import time
+import asyncio
+import argparse
+
+import torch
+
+from local_LLM import QueryEngine
+from batch_scheduler import BatchScheduler
+
+QUESTIONS = [
+    '안녕하세요?'
+    , 'What is the capital of France?'
+    , 'Explain what a hash table is in one paragraph.'
+    , 'Write a Python function that reverses a string.'
+    , 'Why is the sky blue?'
+    , 'List three benefits of unit tests.'
+    , 'What does HTTP stand for?'
+    , 'Summarize the plot of Romeo and Juliet.'
+]
+
+def buildPrompts(qe, count):
+    prompts = []
+    for i in range(count):
+        messages = [{"role": 'user', "content": QUESTIONS[i % len(QUESTIONS)]}]
+        chatPrompt = qe.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        prompts.append(qe.tokenizer(chatPrompt, add_special_tokens=False)["input_ids"])
+
+    return prompts
+
+def runSequential(qe, prompts, maxNewTokens, eosTokenIds):
+    ''' 한 번에 한 요청씩. QueryEngine.generateResponse()와 같은 model.generate 호출 '''
+    generatedTokens = 0
+    startTime = time.time()
+
+    with torch.inference_mode():
+        for promptIds in prompts:
+            inputIds = torch.tensor([promptIds], device=qe.model.device)
+            modelOutput = qe.model.generate(
+                input_ids=inputIds
+                , attention_mask=torch.ones_like(inputIds)
+                , eos_token_id=eosTokenIds
+                , max_new_tokens=maxNewTokens
+                , do_sample=False
+            )
+            newTokens = modelOutput[0, inputIds.shape[1]:].tolist()
+            # 끝의 eos 토큰은 스케줄러와 같이 생성 토큰 수에서 제외
+            generatedTokens = generatedTokens + len([t for t in newTokens if t not in eosTokenIds])
+
+    return generatedTokens, time.time() - startTime
+
+async def runBatched(scheduler, prompts, maxNewTokens, arrivalInterval):
+    async def request(promptIds, delay):
+        await asyncio.sleep(delay)
+        seq = scheduler.submit(promptIds, maxNewTokens)
+        async for text in seq.stream():
+            pass
+        return len(seq.generatedIds)
+
+    startTime = time.time()
+    counts = await asyncio.gather(*[request(promptIds, i * arrivalInterval) for i, promptIds in enumerate(prompts)])
+
+    return sum(counts), time.time() - startTime
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sequential vs batched generation throughput')
+    parser.add_argument('--model', default='HuggingFaceTB/SmolLM2-135M-Instruct')
+    parser.add_argument('--requests', type=int, default=16)
+    parser.add_argument('--max-new-tokens', type=int, default=64)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--arrival-interval', type=float, default=0.2, help='seconds between request arrivals in the staggered run')
+    args = parser.parse_args()
+
+    qe = QueryEngine()
+    qe.loadModel(args.model, False)
+    qe.model.eval()
+
+    prompts = buildPrompts(qe, args.requests)
+    eosTokenIds = sorted(BatchScheduler(qe.model, qe.tokenizer).eosTokenIds)
+
+    # 워밍업
+    runSequential(qe, prompts[:1], 4, eosTokenIds)
+
+    sequentialTokens, sequentialTime = runSequential(qe, prompts, args.max_new_tokens, eosTokenIds)
+    print('sequential: {} tokens, {:.2f} s, {:.1f} tokens/s'.format(
+        sequentialTokens, sequentialTime, sequentialTokens / sequentialTime))
+
+    for name, arrivalInterval in [('burst', 0.0), ('staggered {}s'.format(args.arrival_interval), args.arrival_interval)]:
+        scheduler = BatchScheduler(qe.model, qe.tokenizer, args.max_batch_size)
+        scheduler.start()
+        batchedTokens, batchedTime = asyncio.run(runBatched(scheduler, prompts, args.max_new_tokens, arrivalInterval))
+        scheduler.stop()
+
+        print('batched {} (max batch {}): {} tokens, {:.2f} s, {:.1f} tokens/s, speedup {:.2f}x'.format(
+            name, args.max_batch_size, batchedTokens, batchedTime, batchedTokens / batchedTime
+            , (batchedTokens / batchedTime) / (sequentialTokens / sequentialTime)))
+        print('  scheduler stats:', scheduler.stats)
@@ -0,0 +1,59 @@
+# 시스템 프롬프트 prefix 캐시의 prefill 시간 절감 측정
+# 짧은 질의마다 첫 토큰까지의 시간(max_new_tokens=1)을 prefix 캐시 사용/미사용으로 비교합니다.
+# 캐시 사용 시간에는 past_key_values 복사 비용이 포함됩니다.
+#
+# 실행: lang_models 디렉터리에서
+# python bench_prefix_cache.py --model microsoft/Phi-4-mini-instruct --repeat 5
+
+import io
+import time
+import argparse
+import contextlib
+
+from local_LLM import QueryEngine
+
+QUERIES = ['안녕하세요?', '오늘 날씨 어때?', '파이썬이 뭐야?', '고마워.', '1 더하기 1은?']
+
+def measure(qe, prompts, repeat, usePrefixCache):
+    elapsed = []
+    responses = []
+
+    for _ in range(repeat):
+        for prompt in prompts:
+            with contextlib.redirect_stdout(io.StringIO()):     # generateResponse()의 로그 출력 제외
+                startTime = time.perf_counter()
+                response = qe.generateResponse(prompt, maxNewTokens=1, usePrefixCache=usePrefixCache)
+                elapsed.append(time.perf_counter() - startTime)
+            responses.append(response[0])
+
+    return sum(elapsed) / len(elapsed), responses
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Prefill time with and without the system prompt prefix cache')
+    parser.add_argument('--model', default='microsoft/Phi-4-mini-instruct')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    qe = QueryEngine()
+    qe.loadModel(args.model, False)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        prompts = [qe.generateChatPrompt(query) for query in QUERIES]
+
+    prefixTokens = len(qe.getPrefixCache()["prefixIds"])
+    promptTokens = sum(len(qe.tokenizer(prompt, add_special_tokens=False)["input_ids"]) for prompt in prompts) / len(prompts)
+    print('prefix tokens: {}, mean prompt tokens: {:.1f}'.format(prefixTokens, promptTokens))
+
+    measure(qe, prompts[:1], 1, False)  # 워밍업
+
+    withoutCache, baseResponses = measure(qe, prompts, args.repeat, False)
+    withCache, cachedResponses = measure(qe, prompts, args.repeat, True)
+
+    print('without prefix cache: {:.1f} ms'.format(withoutCache * 1000))
+    print('with prefix cache: {:.1f} ms'.format(withCache * 1000))
+    print('saved: {:.1f} ms ({:.0%})'.format((withoutCache - withCache) * 1000, 1 - withCache / withoutCache))
+    print('same first token:', baseResponses == cachedResponses)
+
+    # 시스템 프롬프트를 바꾸면 캐시가 다시 계산되는지 확인
+    qe.setSystemPrompt('You are a helpful assistant.')
+    print('prefix recomputed for new system prompt:', qe.getPrefixCache()["systemPrompt"] == qe.systemPrompt)
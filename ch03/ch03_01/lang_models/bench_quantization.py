@@ -0,0 +1,118 @@
+# CPU에서 fp32와 int8 동적 양자화 모델의 속도/메모리/출력 차이(drift) 비교
+# 모드마다 새 프로세스에서 모델을 적재하고, 고정된 프롬프트 집합을 greedy 디코딩으로 생성합니다.
+# int8 모드는 ./savedModel/{model}-int8에 저장된 양자화 모델이 있으면 그것을 읽습니다.
+#
+# 실행: lang_models 디렉터리에서
+# python bench_quantization.py --model microsoft/Phi-4-mini-instruct --max-new-tokens 64
+
+import io
+import sys
+import json
+import time
+import argparse
+import resource
+import contextlib
+import subprocess
+
+PROMPTS = [
+    '안녕하세요?'
+    , '파이썬에서 리스트와 튜플의 차이를 설명해 주세요.'
+    , 'What is the capital of France?'
+    , 'Write a Python function that checks whether a number is prime.'
+    , '서울에서 부산까지 KTX로 얼마나 걸리나요?'
+]
+
+def peakRssMb():
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxRss / (1024 * 1024) if sys.platform == 'darwin' else maxRss / 1024    # macOS는 bytes, Linux는 KB
+
+def runChild(modelId, quantize, maxNewTokens):
+    import torch
+    from local_LLM import QueryEngine
+
+    with contextlib.redirect_stdout(io.StringIO()):     # QueryEngine의 로그 출력 제외
+        qe = QueryEngine()
+        qe.device = torch.device('cpu')     # 두 모드 모두 CPU에서 비교
+        qe.loadModel(modelId, True, quantize=quantize)
+        prompts = [qe.generateChatPrompt(prompt) for prompt in PROMPTS]
+
+    modelBuffer = io.BytesIO()
+    torch.save(qe.model.state_dict(), modelBuffer)    # 양자화된 가중치도 포함한 직렬화 크기
+
+    outputs = []
+    generatedTokens = 0
+    startTime = time.time()
+
+    with torch.inference_mode():
+        for prompt in prompts:
+            inputIds = qe.tokenizer(prompt, add_special_tokens=False, return_tensors='pt')["input_ids"]
+            modelOutput = qe.model.generate(
+                input_ids=inputIds
+                , attention_mask=torch.ones_like(inputIds)
+                , eos_token_id=qe.tokenizer.eos_token_id
+                , max_new_tokens=maxNewTokens
+                , do_sample=False
+            )
+            newTokens = modelOutput[0, inputIds.shape[1]:].tolist()
+            generatedTokens = generatedTokens + len(newTokens)
+            outputs.append(newTokens)
+
+    elapsedTime = time.time() - startTime
+
+    print(json.dumps({
+        "tokens_per_sec": generatedTokens / elapsedTime
+        , "model_mb": modelBuffer.getbuffer().nbytes / (1024 * 1024)
+        , "peak_rss_mb": peakRssMb()
+        , "outputs": outputs
+        , "texts": [qe.tokenizer.decode(tokens, skip_special_tokens=True) for tokens in outputs]
+    }, ensure_ascii=False))
+
+def agreement(baseTokens, tokens):
+    ''' fp32 출력과 처음 달라지기 전까지 일치한 토큰 비율 '''
+    matched = 0
+    while matched < min(len(baseTokens), len(tokens)) and baseTokens[matched] == tokens[matched]:
+        matched = matched + 1
+
+    return matched / max(len(baseTokens), 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='fp32 vs dynamic int8 quantization on cpu')
+    parser.add_argument('--model', default='microsoft/Phi-4-mini-instruct')
+    parser.add_argument('--max-new-tokens', type=int, default=64)
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        runChild(args.model, args.child == 'int8', args.max_new_tokens)
+        sys.exit(0)
+
+    reports = {}
+    for mode in ['fp32', 'int8']:
+        result = subprocess.run(
+            [sys.executable, __file__, '--model', args.model, '--max-new-tokens', str(args.max_new_tokens), '--child', mode]
+            , capture_output=True, text=True
+        )
+
+        if result.returncode != 0:
+            print('{}: failed\n{}'.format(mode, result.stderr.strip().splitlines()[-1:]))
+            sys.exit(1)
+
+        reports[mode] = json.loads(result.stdout.strip().splitlines()[-1])
+        print('{}: {:.1f} tokens/s, model {:.0f} MB, peak RSS {:.0f} MB'.format(
+            mode, reports[mode]["tokens_per_sec"], reports[mode]["model_mb"], reports[mode]["peak_rss_mb"]))
+
+    print('speedup: {:.2f}x, model size: {:.0%} of fp32'.format(
+        reports["int8"]["tokens_per_sec"] / reports["fp32"]["tokens_per_sec"]
+        , reports["int8"]["model_mb"] / reports["fp32"]["model_mb"]))
+
+    # 출력 차이(drift): 완전히 같은 응답 수, fp32와 일치한 토큰 비율
+    pairs = list(zip(reports["fp32"]["outputs"], reports["int8"]["outputs"]))
+    exactMatches = sum(1 for baseTokens, tokens in pairs if baseTokens == tokens)
+    meanAgreement = sum(agreement(baseTokens, tokens) for baseTokens, tokens in pairs) / len(pairs)
+    print('identical outputs: {}/{}, mean token agreement before divergence: {:.0%}'.format(exactMatches, len(pairs), meanAgreement))
+
+    for prompt, baseText, text in zip(PROMPTS, reports["fp32"]["texts"], reports["int8"]["texts"]):
+        if baseText != text:
+            print('\nprompt:', prompt)
+            print('  fp32:', baseText)
+            print('  int8:', text)
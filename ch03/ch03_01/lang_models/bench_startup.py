@@ -0,0 +1,68 @@
+# 모델 적재 방식별 시작 시간(wall time)과 최대 메모리(peak RSS) 비교
+# 측정이 서로 영향을 주지 않도록 모드마다 새 프로세스에서 QueryEngine.loadModel()을 실행합니다.
+# safetensors 메모리 매핑 효과를 보려면 먼저 --save로 ./savedModel에 저장한 뒤 실행하세요.
+#
+# 실행: lang_models 디렉터리에서
+# python bench_startup.py --model microsoft/Phi-4-mini-instruct --save
+# python bench_startup.py --model microsoft/Phi-4-mini-instruct
+
+import io
+import sys
+import json
+import time
+import argparse
+import resource
+import contextlib
+import subprocess
+
+# 모드 이름: loadModel() 인자
+MODES = {
+    "fp32 (legacy)": {"dtype": None, "lowCpuMemUsage": False, "warmup": False}
+    , "fp32 low_cpu_mem": {"dtype": None, "lowCpuMemUsage": True, "warmup": False}
+    , "auto low_cpu_mem": {"dtype": 'auto', "lowCpuMemUsage": True, "warmup": False}
+    , "bf16 low_cpu_mem": {"dtype": 'bf16', "lowCpuMemUsage": True, "warmup": False}
+    , "fp16 low_cpu_mem": {"dtype": 'fp16', "lowCpuMemUsage": True, "warmup": False}
+    , "auto low_cpu_mem + warmup": {"dtype": 'auto', "lowCpuMemUsage": True, "warmup": True}
+}
+
+def peakRssMb():
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxRss / (1024 * 1024) if sys.platform == 'darwin' else maxRss / 1024    # macOS는 bytes, Linux는 KB
+
+def runChild(modelId, mode):
+    startTime = time.time()
+
+    with contextlib.redirect_stdout(io.StringIO()):     # loadModel()의 로그 출력 제외
+        from local_LLM import QueryEngine
+        qe = QueryEngine()
+        qe.loadModel(modelId, False, **MODES[mode])
+
+    print(json.dumps({"wall_time": time.time() - startTime, "peak_rss_mb": peakRssMb(), "dtype": str(qe.model.dtype)}))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Startup wall time and peak RSS per loading mode')
+    parser.add_argument('--model', default='microsoft/Phi-4-mini-instruct')
+    parser.add_argument('--save', action='store_true', help='download and save the model under ./savedModel first')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        runChild(args.model, args.child)
+        sys.exit(0)
+
+    if args.save:
+        from local_LLM import QueryEngine
+        QueryEngine().loadModel(args.model, True)
+
+    for mode in MODES:
+        result = subprocess.run(
+            [sys.executable, __file__, '--model', args.model, '--child', mode]
+            , capture_output=True, text=True
+        )
+
+        if result.returncode != 0:
+            print('{}: failed\n{}'.format(mode, result.stderr.strip().splitlines()[-1:]))
+            continue
+
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        print('{}: {:.2f} s, peak RSS {:.0f} MB, {}'.format(mode, report["wall_time"], report["peak_rss_mb"], report["dtype"]))
@@ -0,0 +1,138 @@
+# QueryEngine을 OpenAI 호환 /v1/chat/completions 서버로 제공
+# my_LLM의 chat 라우트가 기본값(LLM_BASE_URL)으로 사용하는 localhost:8080에서 실행합니다.
+# 동시에 들어온 요청은 BatchScheduler가 하나의 배치로 묶어 생성합니다.
+#
+# 실행: lang_models 디렉터리에서
+# python llm_server.py --model microsoft/Phi-4-mini-instruct --port 8080 --max-batch-size 8
+# CPU에서 작은 모델로 확인: python llm_server.py --model HuggingFaceTB/SmolLM2-135M-Instruct
+
+import json
+import time
+import uuid
+import argparse
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from local_LLM import QueryEngine
+from batch_scheduler import BatchScheduler
+
+settings = {
+    "model": 'microsoft/Phi-4-mini-instruct'
+    , "save_model": False
+    , "max_batch_size": 8
+    , "max_new_tokens": 256
+}
+
+queryEngine = None
+scheduler = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global queryEngine, scheduler
+
+    queryEngine = QueryEngine()
+    queryEngine.loadModel(settings["model"], settings["save_model"])
+
+    scheduler = BatchScheduler(queryEngine.model, queryEngine.tokenizer, settings["max_batch_size"])
+    scheduler.start()
+
+    yield
+
+    scheduler.stop()
+
+llmApp = FastAPI(lifespan=lifespan)
+
+def makeChunk(completionId, modelName, delta, finishReason=None):
+    return {
+        "id": completionId
+        , "object": 'chat.completion.chunk'
+        , "created": int(time.time())
+        , "model": modelName
+        , "choices": [{
+            "index": 0
+            , "delta": delta
+            , "finish_reason": finishReason
+        }]
+    }
+
+async def streamCompletion(seq, completionId, modelName):
+    yield 'data: {}\n\n'.format(json.dumps(makeChunk(completionId, modelName, {"role": 'assistant', "content": ''})))
+
+    try:
+        async for text in seq.stream():
+            yield 'data: {}\n\n'.format(json.dumps(makeChunk(completionId, modelName, {"content": text}), ensure_ascii=False))
+    except Exception as e:
+        yield 'data: {}\n\n'.format(json.dumps({"error": {"message": str(e)}}))
+        return
+
+    yield 'data: {}\n\n'.format(json.dumps(makeChunk(completionId, modelName, {}, seq.finishReason)))
+    yield 'data: [DONE]\n\n'
+
+@llmApp.post('/v1/chat/completions')
+async def chatCompletions(request: Request):
+    body = await request.json()
+
+    messages = body.get("messages")
+    if not messages:
+        return JSONResponse(content={"error": {"message": 'messages is required'}}, status_code=400)
+
+    chatPrompt = queryEngine.tokenizer.apply_chat_template(
+        messages, tokenize=False, add_generation_prompt=True
+    )
+    promptIds = queryEngine.tokenizer(chatPrompt, add_special_tokens=False)["input_ids"]
+
+    maxNewTokens = body.get("max_tokens") or settings["max_new_tokens"]
+    seq = scheduler.submit(promptIds, maxNewTokens, body.get("temperature"))
+
+    completionId = 'chatcmpl-{}'.format(uuid.uuid4().hex)
+    modelName = body.get("model", settings["model"])
+
+    if body.get("stream"):
+        return StreamingResponse(streamCompletion(seq, completionId, modelName), media_type='text/event-stream')
+
+    try:
+        content = ''.join([text async for text in seq.stream()])
+    except Exception as e:
+        return JSONResponse(content={"error": {"message": str(e)}}, status_code=500)
+
+    return {
+        "id": completionId
+        , "object": 'chat.completion'
+        , "created": int(time.time())
+        , "model": modelName
+        , "choices": [{"index": 0, "message": {"role": 'assistant', "content": content}, "finish_reason": seq.finishReason}]
+        , "usage": {
+            "prompt_tokens": len(seq.promptIds)
+            , "completion_tokens": len(seq.generatedIds)
+            , "total_tokens": len(seq.promptIds) + len(seq.generatedIds)
+        }
+    }
+
+@llmApp.get('/v1/models')
+async def listModels():
+    return {"object": 'list', "data": [{"id": settings["model"], "object": 'model', "owned_by": 'local'}]}
+
+@llmApp.get('/stats')
+async def getStats():
+    return scheduler.stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='OpenAI-compatible server for QueryEngine')
+    parser.add_argument('--model', default=settings["model"], help='huggingface model id (loaded from ./savedModel if saved)')
+    parser.add_argument('--save-model', action='store_true', help='save the downloaded model under ./savedModel')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=settings["max_batch_size"], help='max sequences decoded together')
+    parser.add_argument('--max-new-tokens', type=int, default=settings["max_new_tokens"], help='default when max_tokens is not given')
+    args = parser.parse_args()
+
+    settings.update({
+        "model": args.model
+        , "save_model": args.save_model
+        , "max_batch_size": args.max_batch_size
+        , "max_new_tokens": args.max_new_tokens
+    })
+
+    uvicorn.run(llmApp, host="0.0.0.0", reload=False, port=args.port)
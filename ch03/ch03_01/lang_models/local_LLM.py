@@ -12,9 +12,21 @@
 # pip install accelerate
 
 import os
+import copy
+import asyncio
+from threading import Thread, Event
 
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import TextIteratorStreamer, AsyncTextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
+
+class StopOnEvent(StoppingCriteria):
+    ''' 스트리밍을 소비하는 쪽이 중단하면(event set) 생성을 멈춤 '''
+    def __init__(self, stopEvent):
+        self.stopEvent = stopEvent
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.stopEvent.is_set(), dtype=torch.bool, device=input_ids.device)
 
 ###########################################
 # LLM 클래스 정의
@@ -35,42 +47,188 @@ class QueryEngine():
 
         print('local_LLM.py.QueryEngine.__init__().self.device:', self.device)
 
-    def loadModel(self, modelId, saveModelAsFile):
-        ''' Load model from saved file or download from huggingface-hub.'''
+        self.systemPrompt = '당신은 사용자의 질문에 답변하는 챗봇입니다.'
+        self.prefixCache = None     # 시스템 프롬프트 부분(채팅 템플릿 prefix)의 past_key_values
+
+    def selectDtype(self, dtype):
+        '''input: None | 'auto' | 'fp32' | 'bf16' | 'fp16'.
+        output: torch.dtype. 'auto'는 GPU에서 bf16(지원 시) 또는 fp16, CPU에서는 fp32.'''
+
+        if dtype is None or dtype == 'fp32':
+            return torch.float32
+        elif dtype == 'auto':
+            if self.device.type == 'cuda':
+                return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            elif self.device.type == 'mps':
+                return torch.float16
+            else:
+                return torch.float32
+        elif dtype == 'bf16':
+            return torch.bfloat16
+        elif dtype == 'fp16':
+            if self.device.type == 'cpu':
+                # CPU에서는 fp16 연산이 대부분 지원되지 않거나 매우 느림
+                print('local_LLM.py.QueryEngine.selectDtype(): fp16 is not supported on cpu, using fp32')
+                return torch.float32
+            return torch.float16
+        else:
+            raise ValueError('unknown dtype: {}'.format(dtype))
+
+    def loadModel(self, modelId, saveModelAsFile, dtype=None, lowCpuMemUsage=True, warmup=False, quantize=False):
+        ''' Load model from saved file or download from huggingface-hub.
+        dtype: None | 'auto' | 'fp32' | 'bf16' | 'fp16'.
+        lowCpuMemUsage: 가중치를 전체 fp32 사본 없이 바로 대상 장치에 적재(accelerate 필요).
+        warmup: 적재 후 짧은 생성을 한 번 실행하여 첫 요청의 지연을 줄임.
+        quantize: Linear 레이어에 int8 동적 양자화를 적용하여 CPU에서 실행. ./savedModel/{modelId}-int8에 저장/재사용.'''
+
+        if quantize:
+            if self.device.type != 'cpu':
+                print('local_LLM.py.QueryEngine.loadModel(): dynamic int8 quantization runs on cpu only')
+                self.device = torch.device('cpu')
+            dtype = None    # 동적 양자화는 fp32 모델을 입력으로 받음
+
+            quantizedModelPath = './savedModel/{}-int8'.format(modelId)
+            quantizedModelFile = os.path.join(quantizedModelPath, 'model_int8.pt')
+
+            if os.path.exists(quantizedModelFile):
+                print('Load quantized model and tokenizer from files: {}'.format(quantizedModelPath))
+                self.dtype = torch.float32
+                self.tokenizer = AutoTokenizer.from_pretrained(quantizedModelPath)
+                # 양자화된 모듈은 save_pretrained()로 저장할 수 없어 모델 객체 전체를 저장함(직접 저장한 파일만 읽을 것)
+                self.model = torch.load(quantizedModelFile, weights_only=False)
+            else:
+                self.__loadPretrained(modelId, False, dtype, lowCpuMemUsage)
+                self.quantizeModel()
+
+                if saveModelAsFile:
+                    os.makedirs(quantizedModelPath, exist_ok=True)
+                    torch.save(self.model, quantizedModelFile)
+                    self.tokenizer.save_pretrained(quantizedModelPath)
+                    print('Save quantized model as file:{}'.format(quantizedModelFile))
+        else:
+            self.__loadPretrained(modelId, saveModelAsFile, dtype, lowCpuMemUsage)
+
+        self.prefixCache = None     # 모델이 바뀌면 prefix 캐시도 다시 계산
+        self.getPrefixCache()
+
+        if warmup:
+            self.warmupModel()
 
+    def __loadPretrained(self, modelId, saveModelAsFile, dtype, lowCpuMemUsage):
         savedModelPath = './savedModel/{}'.format(modelId)
         isMounted = os.path.exists(savedModelPath)
 
+        self.dtype = self.selectDtype(dtype)
+        loadOptions = {"torch_dtype": self.dtype, "low_cpu_mem_usage": lowCpuMemUsage}
+        if lowCpuMemUsage:
+            loadOptions["device_map"] = {"": self.device}   # CPU에 먼저 만든 뒤 .to()로 옮기지 않음
+
         if isMounted:
             print('Load model and tokenizer from files: {}'.format(savedModelPath))
+            if os.path.exists(os.path.join(savedModelPath, 'model.safetensors')) or os.path.exists(os.path.join(savedModelPath, 'model.safetensors.index.json')):
+                loadOptions["use_safetensors"] = True   # 메모리 매핑(mmap)으로 읽음
             self.tokenizer = AutoTokenizer.from_pretrained(savedModelPath)            
-            self.model = AutoModelForCausalLM.from_pretrained(savedModelPath)
+            self.model = AutoModelForCausalLM.from_pretrained(savedModelPath, **loadOptions)
         else:
             print('Load model from huggingface hub: {}'.format(modelId))
             self.tokenizer = AutoTokenizer.from_pretrained(modelId)
-            self.model = AutoModelForCausalLM.from_pretrained(modelId)
+            self.model = AutoModelForCausalLM.from_pretrained(modelId, **loadOptions)
 
             if saveModelAsFile:
                 ##################################
                 # 다운로드한 모델, 토크나이저를 파일로 저장
+                # safetensors로 저장하여 다음 적재 시 메모리 매핑으로 읽음
                 ##################################
                 savePath = './savedModel/{}'.format(modelId)
-                self.model.save_pretrained(savePath)
+                self.model.save_pretrained(savePath, safe_serialization=True)
                 self.tokenizer.save_pretrained(savePath)
                 print('Save model as file:{}'.format(savePath))
             else:
                 pass
 
-        self.model.to(self.device)
+        if not lowCpuMemUsage:
+            self.model.to(self.device)
+        print('local_LLM.py.QueryEngine.loadModel().dtype:', self.model.dtype)
+
+    def quantizeModel(self):
+        ''' Linear 레이어의 가중치를 int8로 양자화. 활성값은 실행 시점에 동적으로 양자화됨(CPU 전용).'''
+        self.model.eval()
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True    # 복사본을 만들지 않아 최대 메모리가 두 배로 늘지 않음
+        )
+        self.prefixCache = None
+        print('local_LLM.py.QueryEngine.quantizeModel(): quantized Linear layers to int8')
+
+    def warmupModel(self):
+        ''' 짧은 생성을 한 번 실행하여 커널 초기화 등 첫 실행 비용을 미리 치름.'''
+        warmupPrompt = self.generateChatPrompt('안녕하세요?')
+        self.generateResponse(warmupPrompt, maxNewTokens=2)
+
+    def setSystemPrompt(self, description):
+        ''' 시스템 프롬프트를 바꾸면 prefix 캐시를 무효화함.'''
+        if description != self.systemPrompt:
+            self.systemPrompt = description
+            self.prefixCache = None
+
+    def getPrefixCache(self):
+        '''output: 시스템 프롬프트까지의 채팅 템플릿 prefix에 대한 {"systemPrompt", "prefixIds", "pastKeyValues"}.
+        모델 로드(또는 시스템 프롬프트 변경) 후 처음 호출될 때 한 번만 계산함.'''
+
+        if self.prefixCache is not None and self.prefixCache["systemPrompt"] == self.systemPrompt:
+            return self.prefixCache
+
+        # 사용자 질의 자리에 표식을 넣어 템플릿을 만들고, 표식 앞부분을 고정 prefix로 사용
+        marker = '<<QUERY>>'
+        sentence = [
+            {"role": 'system', "content": self.systemPrompt}
+            , {"role": 'user', "content": marker}
+        ]
+        templatePrompt = self.tokenizer.apply_chat_template(
+            sentence, tokenize=False, add_generation_prompt=True
+        )
+
+        prefixIds = self.tokenizer(templatePrompt[:templatePrompt.index(marker)], add_special_tokens=False)["input_ids"]
+        templateIds = self.tokenizer(templatePrompt, add_special_tokens=False)["input_ids"]
+
+        # 경계에서 토큰이 합쳐질 수 있으므로 전체 프롬프트 토큰과 일치하는 부분까지만 사용
+        commonLength = 0
+        while commonLength < min(len(prefixIds), len(templateIds)) and prefixIds[commonLength] == templateIds[commonLength]:
+            commonLength = commonLength + 1
+        prefixIds = prefixIds[:commonLength]
+
+        pastKeyValues = None
+        if prefixIds:
+            self.model.eval()
+            with torch.inference_mode():
+                modelOutput = self.model(
+                    input_ids=torch.tensor([prefixIds], device=self.model.device)
+                    , use_cache=True
+                )
+            pastKeyValues = modelOutput.past_key_values
+
+        self.prefixCache = {"systemPrompt": self.systemPrompt, "prefixIds": prefixIds, "pastKeyValues": pastKeyValues}
+        print('local_LLM.py.QueryEngine.getPrefixCache().prefixTokens:', len(prefixIds))
+
+        return self.prefixCache
+
+    def __prefixCacheFor(self, inputIds):
+        ''' 입력이 캐시된 prefix로 시작하면, generate()가 수정해도 되도록 복사한 past_key_values를 반환.'''
+        prefixCache = self.getPrefixCache()
+        prefixIds = prefixCache["prefixIds"]
+
+        if prefixCache["pastKeyValues"] is None or inputIds.shape[0] != 1 or inputIds.shape[1] <= len(prefixIds):
+            return None
+        elif inputIds[0, :len(prefixIds)].tolist() != prefixIds:
+            return None     # 다른 시스템 프롬프트 등으로 prefix가 다름
+        else:
+            return copy.deepcopy(prefixCache["pastKeyValues"])
 
     def generateChatPrompt(self, query):
         '''input: query sentence. 
         output: formatted prompt. <|user|>{prompt}<|end|><|assistant|>'''
 
-        description = '당신은 사용자의 질문에 답변하는 챗봇입니다.'
-
         sentence = [
-            {"role": 'system', "content": description}
+            {"role": 'system', "content": self.systemPrompt}
             , {"role": 'user', "content": query}
         ]
 
@@ -82,7 +240,7 @@ class QueryEngine():
 
         return chatPrompt
 
-    def generateResponse(self, prompt, maxNewTokens=256):
+    def generateResponse(self, prompt, maxNewTokens=256, usePrefixCache=True):
         '''input: prompt.
         output: LLM generated text.'''
 
@@ -97,33 +255,119 @@ class QueryEngine():
         inputIds = tokenizedInput["input_ids"]
         attentionMask = tokenizedInput["attention_mask"] 
 
+        # 시스템 프롬프트 부분의 prefill은 건너뛰고 사용자 질의 부분만 계산
+        pastKeyValues = self.__prefixCacheFor(inputIds) if usePrefixCache else None
+
         modelOutput = self.model.generate(
             input_ids=inputIds
             , attention_mask=attentionMask
+            , past_key_values=pastKeyValues
             , eos_token_id=self.tokenizer.eos_token_id
             , max_new_tokens=maxNewTokens
         )
 
+        # 프롬프트를 제외하고 새로 생성된 토큰만 디코딩
         decodedOutput = self.tokenizer.batch_decode(
-            modelOutput
+            modelOutput[:, inputIds.shape[1]:]
             , skip_special_tokens=True
         )
 
         return decodedOutput
-    
-qe = QueryEngine()
 
-modelId = 'microsoft/Phi-4-mini-instruct'
-qe.loadModel(modelId, True)
+    def __prepareGeneration(self, prompt, maxNewTokens, streamer, stopEvent):
+        self.model.eval()
+
+        tokenizedInput = self.tokenizer(
+            prompt, add_special_tokens=False, return_tensors='pt'
+        ).to(self.model.device)
+
+        return {
+            "input_ids": tokenizedInput["input_ids"]
+            , "attention_mask": tokenizedInput["attention_mask"]
+            , "past_key_values": self.__prefixCacheFor(tokenizedInput["input_ids"])
+            , "eos_token_id": self.tokenizer.eos_token_id
+            , "max_new_tokens": maxNewTokens
+            , "streamer": streamer
+            , "stopping_criteria": StoppingCriteriaList([StopOnEvent(stopEvent)])
+        }
+
+    def __generate(self, generationKwargs):
+        try:
+            self.model.generate(**generationKwargs)
+        except Exception:
+            generationKwargs["streamer"].end()    # 스트림을 기다리는 쪽이 멈춰 있지 않도록 종료 신호
+            raise
+
+    def generateResponseStream(self, prompt, maxNewTokens=256):
+        '''input: prompt.
+        output: (sync generator) 새로 생성된 텍스트 조각. 생성은 별도 스레드에서 실행됨.'''
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stopEvent = Event()
+        generationKwargs = self.__prepareGeneration(prompt, maxNewTokens, streamer, stopEvent)
+
+        errors = []     # 생성 스레드에서 발생한 예외. join() 후 호출한 쪽에서 다시 발생시킴
+
+        def run():
+            try:
+                self.__generate(generationKwargs)
+            except Exception as e:
+                errors.append(e)
+
+        generationThread = Thread(target=run)
+        generationThread.start()
+
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            stopEvent.set()     # 소비하는 쪽이 중간에 멈춘 경우 생성도 중단
+            generationThread.join()
+
+        if errors:
+            raise errors[0]
+
+    async def agenerateResponseStream(self, prompt, maxNewTokens=256):
+        '''input: prompt.
+        output: (async iterator) 새로 생성된 텍스트 조각. 생성은 스레드 풀에서 실행되므로 이벤트 루프를 블로킹하지 않음.
+        FastAPI 웹소켓 라우트에서 async for로 사용.'''
+
+        streamer = AsyncTextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stopEvent = Event()
+        generationKwargs = self.__prepareGeneration(prompt, maxNewTokens, streamer, stopEvent)
+
+        generationTask = asyncio.create_task(asyncio.to_thread(self.__generate, generationKwargs))
+
+        try:
+            async for text in streamer:
+                if text:
+                    yield text
+        finally:
+            stopEvent.set()     # 취소되거나 중간에 멈춘 경우 생성도 중단
+            await generationTask
+
+if __name__ == "__main__":
+    qe = QueryEngine()
+
+    modelId = 'microsoft/Phi-4-mini-instruct'
+    qe.loadModel(modelId, True)
 
-from time import time
+    from time import time
 
-startTime = time()
+    startTime = time()
 
-chatPrompt = qe.generateChatPrompt('안녕하세요?')
+    chatPrompt = qe.generateChatPrompt('안녕하세요?')
 
-response = qe.generateResponse(chatPrompt)
-print('local_LLM.py.response:', response)
+    # 스트리밍으로 생성하여 첫 토큰까지의 시간(TTFT)을 따로 측정
+    firstTokenTime = None
+    response = ''
+    for text in qe.generateResponseStream(chatPrompt):
+        if firstTokenTime is None:
+            firstTokenTime = time()
+        response = response + text
+    print('local_LLM.py.response:', response)
 
-endTime = time()
-print('eplapsedTime:', endTime - startTime)
+    endTime = time()
+    print('ttft:', (firstTokenTime or endTime) - startTime)
+    print('eplapsedTime:', endTime - startTime)
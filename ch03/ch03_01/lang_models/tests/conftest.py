@@ -0,0 +1,9 @@
+# lang_models 테스트 공통 설정. 모듈들은 lang_models 디렉터리에서 스크립트로 실행되므로 같은 경로에서 import 합니다.
+#
+# 실행: lang_models 디렉터리에서
+# python -m pytest -q tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
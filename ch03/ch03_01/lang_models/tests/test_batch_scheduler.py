@@ -0,0 +1,112 @@
+# BatchScheduler가 시간차를 두고 도착한 요청들을 묶어 생성해도 요청별 model.generate(greedy)와 같은 토큰을 만드는지 확인
+# 다운로드 없이 CPU에서 실행되도록 작은 Llama 모델을 무작위 가중치로 만들어 사용합니다.
+
+import asyncio
+
+import torch
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from batch_scheduler import BatchScheduler
+
+class TinyTokenizer:
+    ''' 토큰 id를 그대로 텍스트로 바꾸는 토크나이저 '''
+    eos_token_id = None
+    pad_token_id = 0
+
+    def decode(self, ids, skip_special_tokens=True):
+        return ''.join('<{}>'.format(tokenId) for tokenId in ids)
+
+def makeTinyModel():
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2
+        , num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=256
+        , bos_token_id=None, eos_token_id=None, pad_token_id=0
+    )
+    model = LlamaForCausalLM(config).double().eval()    # 패딩 유무에 따른 미세한 수치 차이로 argmax가 바뀌지 않도록 fp64
+    model.generation_config.eos_token_id = None
+    model.generation_config.pad_token_id = 0
+
+    return model
+
+PROMPTS = [
+    [5, 17, 33, 2, 9, 41, 12, 7]
+    , [60, 3, 22]
+    , [8, 8, 19, 50, 27, 31, 44, 13, 6, 25, 38, 10, 58]
+    , [14, 29, 36, 4, 55]
+]
+MAX_NEW_TOKENS = 24
+
+def referenceTokens(model, promptIds):
+    inputIds = torch.tensor([promptIds])
+    with torch.inference_mode():
+        modelOutput = model.generate(
+            input_ids=inputIds
+            , attention_mask=torch.ones_like(inputIds)
+            , max_new_tokens=MAX_NEW_TOKENS
+            , do_sample=False
+        )
+
+    return modelOutput[0, inputIds.shape[1]:].tolist()
+
+def test_staggered_requests_match_sequential_greedy_generate():
+    model = makeTinyModel()
+    scheduler = BatchScheduler(model, TinyTokenizer(), maxBatchSize=4)
+
+    async def main():
+        scheduler.start()
+        try:
+            seqs = []
+            streams = []
+            texts = []
+
+            for promptIds in PROMPTS:
+                seq = scheduler.submit(promptIds, MAX_NEW_TOKENS)
+                stream = seq.stream()
+                texts.append(await stream.__anext__())  # 앞 요청이 디코딩 중일 때 다음 요청이 합류하도록 첫 조각을 받은 뒤 제출
+                seqs.append(seq)
+                streams.append(stream)
+
+            for i, stream in enumerate(streams):
+                async for text in stream:
+                    texts[i] = texts[i] + text
+
+            return seqs, texts
+        finally:
+            await asyncio.to_thread(scheduler.stop)
+
+    seqs, texts = asyncio.run(asyncio.wait_for(main(), timeout=120))
+
+    assert scheduler.stats["prefills"] > 1      # 디코딩 중에 새 요청이 합류함
+    assert scheduler.stats["prefill_tokens"] == sum(len(promptIds) for promptIds in PROMPTS)   # 생성 중인 시퀀스는 다시 prefill하지 않음
+    assert scheduler.stats["max_batch_size"] > 1
+
+    for promptIds, seq, text in zip(PROMPTS, seqs, texts):
+        expected = referenceTokens(model, promptIds)
+        assert seq.generatedIds == expected
+        assert seq.finishReason == 'length'
+        assert text == TinyTokenizer().decode(expected)
+
+def test_stop_finishes_pending_requests():
+    model = makeTinyModel()
+    scheduler = BatchScheduler(model, TinyTokenizer(), maxBatchSize=1)
+
+    async def main():
+        scheduler.start()
+        seqs = [scheduler.submit(promptIds, 200) for promptIds in PROMPTS]
+
+        first = seqs[0].stream()
+        await first.__anext__()     # 첫 요청이 배치를 차지하고 나머지는 대기열에 남음
+        await asyncio.to_thread(scheduler.stop)
+
+        async def drain(stream):
+            async for _ in stream:
+                pass
+
+        await asyncio.wait_for(asyncio.gather(drain(first), *[drain(seq.stream()) for seq in seqs[1:]]), timeout=10)
+
+        return seqs
+
+    seqs = asyncio.run(main())
+
+    assert all(seq.finishReason == 'cancelled' for seq in seqs)
@@ -0,0 +1,52 @@
+# 생성 중 model.generate()가 실패하면 스트리밍 생성기가 잘린 응답으로 정상 종료하지 않고 예외를 전달하는지 확인
+
+import asyncio
+
+import torch
+import pytest
+from transformers import BatchEncoding
+
+from local_LLM import QueryEngine
+
+class FakeTokenizer:
+    eos_token_id = 0
+
+    def __call__(self, prompt, add_special_tokens=False, return_tensors=None):
+        inputIds = torch.tensor([[1, 2, 3]])
+        return BatchEncoding({"input_ids": inputIds, "attention_mask": torch.ones_like(inputIds)})
+
+    def decode(self, ids, skip_special_tokens=True):
+        return ''
+
+class FailingModel:
+    ''' 생성 도중 실패하는 모델(예: CUDA OOM) '''
+    device = 'cpu'
+
+    def eval(self):
+        return self
+
+    def generate(self, **generationKwargs):
+        raise RuntimeError('generation failed')
+
+def makeQueryEngine():
+    qe = QueryEngine()
+    qe.model = FailingModel()
+    qe.tokenizer = FakeTokenizer()
+    qe.prefixCache = {"systemPrompt": qe.systemPrompt, "prefixIds": [], "pastKeyValues": None}   # prefix 캐시 계산 생략
+
+    return qe
+
+def test_stream_raises_generation_error():
+    qe = makeQueryEngine()
+
+    with pytest.raises(RuntimeError, match='generation failed'):
+        list(qe.generateResponseStream('prompt'))
+
+def test_async_stream_raises_generation_error():
+    qe = makeQueryEngine()
+
+    async def main():
+        return [text async for text in qe.agenerateResponseStream('prompt')]
+
+    with pytest.raises(RuntimeError, match='generation failed'):
+        asyncio.run(main())
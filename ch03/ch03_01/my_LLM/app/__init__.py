@@ -7,12 +7,14 @@ appCfg = AppConfig("config.json")
 
 import aiomysql
 
+from app.utils.db import ObservedPool
+
 pool = None
 
-async def createConnectionPool(host, portNum, username, password, dbname, minPoolsize, maxPoolsize):
+async def createConnectionPool(host, portNum, username, password, dbname, minPoolsize, maxPoolsize, poolRecycle, connectTimeout):
     global pool
 
-    pool = await aiomysql.create_pool(
+    pool = ObservedPool(await aiomysql.create_pool(
         host=host
         , port=portNum
         , user=username
@@ -20,7 +22,11 @@ async def createConnectionPool(host, portNum, username, password, dbname, minPoo
         , db=dbname
         , minsize=minPoolsize
         , maxsize=maxPoolsize
-    )
+        , pool_recycle=poolRecycle
+        , connect_timeout=connectTimeout
+    ))
+
+    await pool.warmup()  # minsize만큼 미리 연결 확인
 
 async def deleteConnectionPool():
     global pool
@@ -30,13 +36,118 @@ async def deleteConnectionPool():
         await pool.wait_closed()
         pool = None
 
+import asyncio
+import httpx
+import openai
+
+from app.utils.semantic_cache import semanticCacheRegistry
+from app.utils.crypto import CryptoPool
+from app.utils.db import queryRegistry
+from app.utils.user_cache import UserInfoCache, LocalInvalidationChannel
+from app.utils.token_cache import VerifiedTokenCache, checkVerifier
+from app.utils.metrics import markProcessDead
+
+llmClient = None
+
+def createLLMClient(baseUrl, apiKey, maxConnections, maxKeepaliveConnections, keepaliveExpiry, connectTimeout, timeout):
+    global llmClient
+
+    # 앱 전체에서 하나의 HTTP 커넥션 풀(keep-alive)을 공유하는 LLM 클라이언트
+    httpClient = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=maxConnections
+            , max_keepalive_connections=maxKeepaliveConnections
+            , keepalive_expiry=keepaliveExpiry
+        )
+        , timeout=httpx.Timeout(timeout, connect=connectTimeout)
+    )
+
+    llmClient = openai.AsyncOpenAI(
+        base_url=baseUrl
+        , api_key=apiKey
+        , http_client=httpClient
+    )
+
+async def deleteLLMClient():
+    global llmClient
+
+    if llmClient:
+        await llmClient.close()
+        llmClient = None
+
+cryptoPool = None
+
+def createCryptoPool(maxWorkers, maxQueueSize, rounds):
+    global cryptoPool
+
+    cryptoPool = CryptoPool(maxWorkers, maxQueueSize, rounds)
+
+def deleteCryptoPool():
+    global cryptoPool
+
+    if cryptoPool:
+        cryptoPool.shutdown()
+        cryptoPool = None
+
+userCache = None
+
+def createUserCache(maxSize, ttl, channel=None):
+    global userCache
+
+    userCache = UserInfoCache(maxSize, ttl, channel)
+
+tokenCache = None
+
+def createTokenCache(maxSize):
+    global tokenCache
+
+    tokenCache = VerifiedTokenCache(maxSize)
+
 @asynccontextmanager
 async def lifespan(app):
     print('Starting FastAPI app.')
-    await createConnectionPool('localhost', 3306, appCfg.DB_USER, appCfg.DB_PASSWORD, appCfg.DB, 1, 10)
+    queryRegistry.load(appCfg.QUERY_HOT_RELOAD)    # 쿼리 파일을 한 번만 읽음. 없으면 시작 단계에서 실패
+    checkVerifier(appCfg.JWT_VERIFIER)      # 토큰 검증 설정이 잘못되었으면 시작 단계에서 실패
+    await createConnectionPool(
+        appCfg.DB_HOST
+        , appCfg.DB_PORT
+        , appCfg.DB_USER
+        , appCfg.DB_PASSWORD
+        , appCfg.DB
+        , appCfg.DB_POOL_MINSIZE
+        , appCfg.DB_POOL_MAXSIZE
+        , appCfg.DB_POOL_RECYCLE
+        , appCfg.DB_CONNECT_TIMEOUT
+    )
+    createLLMClient(
+        appCfg.LLM_BASE_URL
+        , appCfg.LLM_API_KEY
+        , appCfg.LLM_MAX_CONNECTIONS
+        , appCfg.LLM_MAX_KEEPALIVE_CONNECTIONS
+        , appCfg.LLM_KEEPALIVE_EXPIRY
+        , appCfg.LLM_CONNECT_TIMEOUT
+        , appCfg.LLM_TIMEOUT
+    )
+    createCryptoPool(appCfg.CRYPTO_POOL_WORKERS, appCfg.CRYPTO_POOL_MAX_QUEUE, appCfg.BCRYPT_ROUNDS)
+    createUserCache(appCfg.USER_CACHE_SIZE, appCfg.USER_CACHE_TTL, LocalInvalidationChannel())
+    createTokenCache(appCfg.TOKEN_CACHE_SIZE)
+    semanticCacheRegistry.ttl = appCfg.SEMANTIC_CACHE_TTL
+    semanticCacheRegistry.backend = appCfg.SEMANTIC_CACHE_BACKEND
+    semanticCacheRegistry.host = appCfg.CHROMA_HOST
+    semanticCacheRegistry.port = appCfg.CHROMA_PORT
+    sweeperTask = asyncio.create_task(semanticCacheRegistry.runSweeper(appCfg.SEMANTIC_CACHE_SWEEP_INTERVAL))
     yield
     print('Stopping FastAPI app.')
+    sweeperTask.cancel()
+    try:
+        await sweeperTask
+    except asyncio.CancelledError:
+        pass
+    await deleteLLMClient()
     await deleteConnectionPool()
+    deleteCryptoPool()
+    semanticCacheRegistry.close()
+    markProcessDead()   # 멀티프로세스 지표: 종료된 워커의 Gauge 값 제외
 
 app = FastAPI(lifespan=lifespan)
 
@@ -48,3 +159,6 @@ app.include_router(user_routes.userRouter)
 
 from app.api.routes import chat_routes
 app.include_router(chat_routes.chatRouter)
+
+from app.api.routes import admin_routes
+app.include_router(admin_routes.adminRouter)
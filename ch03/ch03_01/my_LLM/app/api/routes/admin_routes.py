@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Response, Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from prometheus_client import CONTENT_TYPE_LATEST
+from typing import Annotated
+
+from app.services.user import User
+from app.utils.metrics import generateMetrics
+
+adminRouter = APIRouter()
+
+oauth2Scheme = OAuth2PasswordBearer(tokenUrl='/login')  # get access token in HTTP header.
+
+async def requireAdmin(
+    token: Annotated[str, Depends(oauth2Scheme)]
+    , userService: Annotated[User, Depends(User)]
+):
+    """ 액세스 토큰의 사용자가 관리자(user_info.privilege >= ADMIN_PRIVILEGE)가 아니면 요청을 거절합니다. """
+    from app import appCfg
+
+    payload = userService.decodeAccessToken(token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail='Invalid access token.', headers={"WWW-Authenticate": 'Bearer'})
+
+    userInfo = await userService.getUserInfoById(payload["id"])
+    if userInfo is None or (userInfo.get("privilege") or 0) < appCfg.ADMIN_PRIVILEGE:
+        raise HTTPException(status_code=403, detail='Admin privilege required.')
+
+    return userInfo
+
+@adminRouter.get('/admin/db/pool', dependencies=[Depends(requireAdmin)])
+async def getPoolStats():
+    """ DB 커넥션 풀 상태(사용 중, 유휴, 대기 수, 획득 대기 시간 히스토그램)를 반환합니다. """
+    from app import pool
+
+    if pool is None:
+        return {}
+
+    return pool.getStats()
+
+@adminRouter.get('/metrics')
+async def getMetrics():
+    """ 채팅 파이프라인 지표를 Prometheus text 형식으로 반환합니다. 워커가 여러 개이면 모든 워커의 값을 합칩니다. """
+    return Response(content=generateMetrics(), media_type=CONTENT_TYPE_LATEST)
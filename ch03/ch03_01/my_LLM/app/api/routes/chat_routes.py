@@ -2,14 +2,19 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from typing import Annotated
-import openai
 import json
 import asyncio
+import time
 import litellm
 
 from app.services.user import User
-from app.utils.semantic_cache import SemanticCache
-from app.services.async_llm_api import asyncCompletion
+from app.utils.semantic_cache import semanticCacheRegistry
+from app.services.single_flight import llmSingleFlight
+from app.utils.stream_writer import StreamWriter
+from app.utils.metrics import (
+    CHAT_TTFT, CHAT_TOKENS_PER_TURN, CHAT_ACTIVE_WEBSOCKETS, CHAT_MESSAGE_QUEUE_DEPTH
+    , SEMANTIC_CACHE_LOOKUPS, SEMANTIC_CACHE_LOOKUP_LATENCY, SEMANTIC_CACHE_DISTANCE
+)
 
 chatRouter = APIRouter()
 
@@ -24,8 +29,8 @@ async def getCacheInfo(
     payload = userService.decodeAccessToken(token)
     colName = payload["username"].replace('@', '_')
 
-    semanticCache = SemanticCache(collectionName=colName)
-    info = semanticCache.getCollectionInfo()
+    semanticCache = await semanticCacheRegistry.agetSemanticCache(colName)
+    info = await semanticCache.ainfo()
 
     # info: 
     # {
@@ -47,36 +52,44 @@ async def sendChunk(
     # 캐시 응답 전송
     if cached:
         chunks = content.split(' ')
-        for chunk in chunks:
-            # 취소 요청이 있는지 확인
-            try:
-                fullResponse = fullResponse + chunk + ' '
-                await ws.send_text('Assistant: {}'.format(chunk + ' '))
-                await asyncio.sleep(0.05)
-            except asyncio.CancelledError:
-                raise  # 취소 예외를 다시 발생시켜 상위로 전파
+        # 고정 지연 없이 토큰을 프레임으로 모아 전송(클라이언트 속도에 맞춤)
+        async with StreamWriter(ws, prefix='Assistant: ') as writer:
+            for chunk in chunks:
+                # 취소 요청이 있는지 확인
+                try:
+                    fullResponse = fullResponse + chunk + ' '
+                    await writer.write(chunk + ' ')
+                except asyncio.CancelledError:
+                    raise  # 취소 예외를 다시 발생시켜 상위로 전파
         await ws.send_text('--- Full Response: {} ---'.format(content))
     # 스트리밍 응답 전송
     else:
+        startTime = time.time()
+        tokenCount = 0
         try:
-            for chunk in content:
-                try:
-                    if len(chunk.choices) > 0:
-                        if chunk.choices[0].delta.content is not None:
-                            chunkContent = chunk.choices[0].delta.content
-                            fullResponse = fullResponse + chunkContent
-                            await ws.send_text('Assistant: {}'.format(chunkContent))
-                            await asyncio.sleep(0.05)
-                        else:   # no data to send
+            async with StreamWriter(ws, prefix='Assistant: ') as writer:
+                for chunk in content:
+                    try:
+                        if len(chunk.choices) > 0:
+                            if chunk.choices[0].delta.content is not None:
+                                chunkContent = chunk.choices[0].delta.content
+                                fullResponse = fullResponse + chunkContent
+                                if tokenCount == 0:
+                                    CHAT_TTFT.observe(time.time() - startTime)
+                                tokenCount = tokenCount + 1
+                                await writer.write(chunkContent)
+                            else:   # no data to send
+                                pass
+                        else:   # the last chunk - usage info.
                             pass
-                    else:   # the last chunk - usage info.
-                        pass
-                except asyncio.CancelledError:
-                    raise  # 취소 예외를 다시 발생시켜 상위로 전파
+                    except asyncio.CancelledError:
+                        raise  # 취소 예외를 다시 발생시켜 상위로 전파
         except Exception as stream_error:
             print('chat_routes.py.chat().stream_error:', stream_error)
             await ws.send_text('Error: Response generation was interrupted.')
     
+        CHAT_TOKENS_PER_TURN.observe(tokenCount)
+
         # 스트리밍 완료 후 전체 응답도 전송
         await ws.send_text('--- Full Response: {} ---'.format(fullResponse))
 
@@ -92,37 +105,53 @@ async def asyncSendChunk(
     # 캐시 응답 전송
     if cached:
         chunks = content.split(' ')
-        for chunk in chunks:
-            # 취소 요청이 있는지 확인
-            try:
-                fullResponse = fullResponse + chunk + ' '
-                await ws.send_text('Assistant: {}'.format(chunk + ' '))
-                await asyncio.sleep(0.05)
-            except asyncio.CancelledError:
-                raise  # 취소 예외를 다시 발생시켜 상위로 전파
+        # 고정 지연 없이 토큰을 프레임으로 모아 전송(클라이언트 속도에 맞춤)
+        async with StreamWriter(ws, prefix='Assistant: ') as writer:
+            for chunk in chunks:
+                # 취소 요청이 있는지 확인
+                try:
+                    fullResponse = fullResponse + chunk + ' '
+                    await writer.write(chunk + ' ')
+                except asyncio.CancelledError:
+                    raise  # 취소 예외를 다시 발생시켜 상위로 전파
         await ws.send_text('--- Full Response: {} ---'.format(content))
     # 스트리밍 응답 전송
     else:
+        startTime = time.time()
+        tokenCount = 0
         try:
-            async for chunk in content:   # async iterator
-                try:
-                    if len(chunk.choices) > 0:
-                        if chunk.choices[0].delta.content is not None:
-                            chunkContent = chunk.choices[0].delta.content
-                            fullResponse = fullResponse + chunkContent
-                            await ws.send_text('Assistant: {}'.format(chunkContent))
-                            await asyncio.sleep(0.05)
-                        else:   # no data to send
+            async with StreamWriter(ws, prefix='Assistant: ') as writer:
+                async for chunk in content:   # async iterator
+                    try:
+                        if len(chunk.choices) > 0:
+                            if chunk.choices[0].delta.content is not None:
+                                chunkContent = chunk.choices[0].delta.content
+                                fullResponse = fullResponse + chunkContent
+                                if tokenCount == 0:
+                                    CHAT_TTFT.observe(time.time() - startTime)
+                                tokenCount = tokenCount + 1
+                                await writer.write(chunkContent)
+                            else:   # no data to send
+                                pass
+                        else:   # the last chunk - usage info.
                             pass
-                    else:   # the last chunk - usage info.
-                        pass
-                except asyncio.CancelledError:
-                    raise  # 취소 예외를 다시 발생시켜 상위로 전파
+                    except asyncio.CancelledError:
+                        raise  # 취소 예외를 다시 발생시켜 상위로 전파
+        except asyncio.CancelledError:
+            # 취소 시 LLM 서버와의 HTTP 스트림 연결(또는 single-flight 구독)을 닫음
+            close = getattr(content, 'aclose', None) or getattr(content, 'close', None)
+            if close is not None:
+                closing = close()
+                if asyncio.iscoroutine(closing):
+                    await closing
+            raise
         except Exception as stream_error:
             print('chat_routes.py.chat().stream_error:', stream_error)
             await ws.send_text('Error: Response generation was interrupted.')
             # continue
     
+        CHAT_TOKENS_PER_TURN.observe(tokenCount)
+
         # 스트리밍 완료 후 전체 응답도 전송
         await ws.send_text('--- Full Response: {} ---'.format(fullResponse))
 
@@ -134,15 +163,17 @@ async def chat(
     , userService: Annotated[User, Depends(User)]
 ):
     await ws.accept()
-    await ws.send_text('Server: Welcome to the chat!')
     print('chat_routes.py.chat.ws.state: {}'.format(ws.client_state))
 
-    client = openai.OpenAI(
-        base_url='http://localhost:8080/v1'
-        , api_key='no-key-required'
-    )
+    # 앱 수명 동안 공유되는 비동기 클라이언트(lifespan에서 생성): 연결마다 커넥션 풀을 새로 만들지 않음.
+    from app import llmClient
+
+    client = llmClient
 
+    CHAT_ACTIVE_WEBSOCKETS.inc()    # finally에서 dec()
     try:
+        await ws.send_text('Server: Welcome to the chat!')
+
         currentSendChunkTask = None  # 현재 실행 중인 sendChunk 태스크를 추적
         currentCompletionTask = None  # 현재 실행 중인 asyncCompletion 태스크를 추적
         messageQueue = asyncio.Queue()  # 메시지 큐
@@ -171,18 +202,22 @@ async def chat(
                         await ws.send_text('Server: Response generation stopped.')
                     else:
                         await messageQueue.put(parsedMessage)    # string to dict
+                        CHAT_MESSAGE_QUEUE_DEPTH.inc()
                 except WebSocketDisconnect:
                     await messageQueue.put({"type": "disconnect"})
+                    CHAT_MESSAGE_QUEUE_DEPTH.inc()
                     break
                 except Exception as e:
                     print("Message receiver error: {}".format(e))
                     await messageQueue.put({"type": "error", "message": str(e)})
+                    CHAT_MESSAGE_QUEUE_DEPTH.inc()
                     break
         
         receiverTask = asyncio.create_task(messageReceiver())
         
         while True:
             userMessage = await messageQueue.get()
+            CHAT_MESSAGE_QUEUE_DEPTH.dec()
 
             if userMessage["type"] == "disconnect":
                 break
@@ -196,16 +231,29 @@ async def chat(
                     payload = userService.decodeAccessToken(authToken)
 
                     colName = payload["username"].replace('@', '_')
-                    semanticCache = SemanticCache(collectionName=colName)
+                    semanticCache = await semanticCacheRegistry.agetSemanticCache(colName)
                 else:
-                    semanticCache = SemanticCache() # use default collection
+                    semanticCache = await semanticCacheRegistry.agetSemanticCache() # use default collection
             else:   # userMessage["type"] == 'chat'
                 message = userMessage["message"]
                 print('chat_routes.py.chat().message:', message)
 
-                cachedCompletion = semanticCache.queryToCache(message)
+                lookupStartTime = time.time()
+                cachedCompletion = await semanticCache.aquery(message)
+                SEMANTIC_CACHE_LOOKUP_LATENCY.observe(time.time() - lookupStartTime)
                 print('semanticCache.queryToCache(message):', cachedCompletion)
 
+                if cachedCompletion is None:
+                    SEMANTIC_CACHE_LOOKUPS.labels(result='miss').inc()
+                else:
+                    SEMANTIC_CACHE_DISTANCE.observe(cachedCompletion["distance"])
+                    if cachedCompletion["distance"] == 0:
+                        SEMANTIC_CACHE_LOOKUPS.labels(result='exact').inc()
+                    elif cachedCompletion["distance"] < 0.05:
+                        SEMANTIC_CACHE_LOOKUPS.labels(result='similar').inc()
+                    else:
+                        SEMANTIC_CACHE_LOOKUPS.labels(result='miss').inc()
+
                 if cachedCompletion is not None and cachedCompletion["distance"] < 0.05:
                     content = cachedCompletion["response"]
                     currentSendChunkTask = asyncio.create_task(sendChunk(ws, content, True))
@@ -216,23 +264,15 @@ async def chat(
                     finally:
                         currentSendChunkTask = None
                 else:
-                    currentCompletionTask = asyncio.create_task(asyncCompletion(client, 'Phi-4-mini-instruct', message, True))
-                    try:
-                        response = await currentCompletionTask
-                    except asyncio.CancelledError:
-                        print('chat_routes.py.chat().Completion task cancelled.')
-                        continue
-                    except Exception as e:
-                        print('chat_routes.py.chat().Completion task error:', e)
-                        continue
-                    finally:
-                        currentCompletionTask = None
+                    # 같은 프롬프트를 생성 중인 요청이 있으면 새로 요청하지 않고 같은 토큰 스트림을 구독(single-flight)
+                    # asyncCompletion() 호출과 생성 완료 후 캐시 저장은 single-flight에서 한 번만 수행
+                    response = llmSingleFlight.stream(client, 'Phi-4-mini-instruct', message, semanticCache)
 
-                    currentSendChunkTask = asyncio.create_task(sendChunk(ws, response, False))
+                    currentSendChunkTask = asyncio.create_task(asyncSendChunk(ws, response, False))
                     try:
                         full_response = await currentSendChunkTask
                     except asyncio.CancelledError:
-                        print('chat_routes.py.chat().sendChunk() task cancelled.')
+                        print('chat_routes.py.chat().asyncSendChunk() task cancelled.')
                         continue
                     finally:
                         currentSendChunkTask = None
@@ -282,8 +322,7 @@ async def chat(
                     # finally:
                     #     currentSendChunkTask = None
 
-                    semanticCache.addToCache(message, full_response)
-                    colInfo = semanticCache.getCollectionInfo()
+                    colInfo = await semanticCache.ainfo()
                     print('chat_routes.py.chat().semanticCache.getCollectionInfo():', colInfo)
 
     except WebSocketDisconnect:
@@ -300,3 +339,8 @@ async def chat(
                 await receiverTask
             except asyncio.CancelledError:
                 pass
+
+        # 처리하지 않은 메시지는 큐 깊이 지표에서 제외
+        if 'messageQueue' in locals():
+            CHAT_MESSAGE_QUEUE_DEPTH.dec(messageQueue.qsize())
+        CHAT_ACTIVE_WEBSOCKETS.dec()
@@ -8,19 +8,31 @@ async def sendSignupPage():
     return FileResponse("app/templates/signup.html")
 
 from app.services.user import User
+from app.utils.crypto import CryptoPoolFullError
 from typing import Annotated
 
+def busyResponse():
+    ''' 비밀번호 해시 작업 대기열이 가득 찬 경우의 응답 '''
+    respJSON = {
+        "success": False
+        , "content": '요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해 주세요.'
+    }
+
+    return JSONResponse(content=respJSON, status_code=503)
+
 @userRouter.post("/signup")    # 201: Created
 async def signup(
     userService: Annotated[User, Depends(User)]
     , username: str = Form(...)
     , password: str = Form(...)
 ):
-    existingUser = await userService.getUserInfoByName(username)
-
-    if existingUser is None:
+    # username 유일 인덱스에 의존하여 INSERT 한 번으로 처리(중복이면 None)
+    try:
         lastrowid = await userService.createUser(username, password)
+    except CryptoPoolFullError:
+        return busyResponse()
 
+    if lastrowid is not None:
         respJSON = {
             "success": True
             , "content": ''
@@ -50,7 +62,10 @@ async def login(
     loginInfo: Annotated[OAuth2PasswordRequestForm, Depends()]
     , userService: Annotated[User, Depends(User)]
 ):
-    userInfo = await userService.veryfyUserByName(loginInfo.username, loginInfo.password)
+    try:
+        userInfo = await userService.veryfyUserByName(loginInfo.username, loginInfo.password)
+    except CryptoPoolFullError:
+        return busyResponse()
 
     if userInfo is not None:
         tokenPayload = {
@@ -98,10 +113,13 @@ async def closeAccount(
     payload = userService.decodeAccessToken(token)
     id = payload["id"]
 
-    check = await userService.verifyUserById(id, password)
+    try:
+        check = await userService.verifyUserById(id, password)
+    except CryptoPoolFullError:
+        return busyResponse()
 
     if check:
-        await userService.deleteUserById(id)
+        await userService.deleteUserById(id, payload["username"])
 
         jsonResp = {
             "success": True 
@@ -11,5 +11,51 @@ class AppConfig():
         self.DB = self.config.get("DB")
         self.DB_USER = self.config.get("DB_USER")
         self.DB_PASSWORD = self.config.get("DB_PASSWORD")
+        self.DB_HOST = self.config.get("DB_HOST", 'localhost')
+        self.DB_PORT = self.config.get("DB_PORT", 3306)
+        self.DB_POOL_MINSIZE = self.config.get("DB_POOL_MINSIZE", 1)
+        self.DB_POOL_MAXSIZE = self.config.get("DB_POOL_MAXSIZE", 10)
+        self.DB_POOL_RECYCLE = self.config.get("DB_POOL_RECYCLE", -1)           # seconds, -1: 재활용하지 않음
+        self.DB_CONNECT_TIMEOUT = self.config.get("DB_CONNECT_TIMEOUT", 60)     # seconds
         self.JWT_SECRET = self.config.get("JWT_SECRET")
         self.JWT_ALGORITHM = self.config.get("JWT_ALGORITHM")
+
+        # LLM 서버(OpenAI 호환) 연결 설정
+        self.LLM_BASE_URL = self.config.get("LLM_BASE_URL", 'http://localhost:8080/v1')
+        self.LLM_API_KEY = self.config.get("LLM_API_KEY", 'no-key-required')
+        self.LLM_MAX_CONNECTIONS = self.config.get("LLM_MAX_CONNECTIONS", 100)
+        self.LLM_MAX_KEEPALIVE_CONNECTIONS = self.config.get("LLM_MAX_KEEPALIVE_CONNECTIONS", 20)
+        self.LLM_KEEPALIVE_EXPIRY = self.config.get("LLM_KEEPALIVE_EXPIRY", 30.0)   # seconds
+        self.LLM_CONNECT_TIMEOUT = self.config.get("LLM_CONNECT_TIMEOUT", 5.0)      # seconds
+        self.LLM_TIMEOUT = self.config.get("LLM_TIMEOUT", 60.0)                     # seconds
+
+        # 시맨틱 캐시 만료 설정
+        self.SEMANTIC_CACHE_TTL = self.config.get("SEMANTIC_CACHE_TTL", 7*24*60*60)                 # seconds
+        self.SEMANTIC_CACHE_SWEEP_INTERVAL = self.config.get("SEMANTIC_CACHE_SWEEP_INTERVAL", 60*60)  # seconds
+
+        # 비밀번호 해시(bcrypt) 설정
+        self.BCRYPT_ROUNDS = self.config.get("BCRYPT_ROUNDS", 12)                   # cost factor
+        self.CRYPTO_POOL_WORKERS = self.config.get("CRYPTO_POOL_WORKERS", None)     # None: CPU 코어 수
+        self.CRYPTO_POOL_MAX_QUEUE = self.config.get("CRYPTO_POOL_MAX_QUEUE", 64)
+
+        # 개발 모드: SQL 쿼리 파일 변경 시 다시 읽음
+        self.QUERY_HOT_RELOAD = self.config.get("QUERY_HOT_RELOAD", False)
+
+        # 사용자 정보 캐시 설정
+        self.USER_CACHE_SIZE = self.config.get("USER_CACHE_SIZE", 10000)
+        self.USER_CACHE_TTL = self.config.get("USER_CACHE_TTL", 300)   # seconds
+
+        # 액세스 토큰 검증 설정
+        self.JWT_VERIFIER = self.config.get("JWT_VERIFIER", 'jose')     # 'jose' 또는 'pyjwt'
+        self.TOKEN_CACHE_SIZE = self.config.get("TOKEN_CACHE_SIZE", 10000)
+
+        # 시맨틱 캐시 저장소: 'embedded'(단일 워커) 또는 'http'(Chroma 서버를 여러 워커가 공유)
+        self.SEMANTIC_CACHE_BACKEND = self.config.get("SEMANTIC_CACHE_BACKEND", 'embedded')
+        self.CHROMA_HOST = self.config.get("CHROMA_HOST", 'localhost')
+        self.CHROMA_PORT = self.config.get("CHROMA_PORT", 8001)
+
+        # /admin 라우트에 접근할 수 있는 최소 user_info.privilege 값
+        self.ADMIN_PRIVILEGE = self.config.get("ADMIN_PRIVILEGE", 1)
+
+        # uvicorn 워커 프로세스 수
+        self.WORKERS = self.config.get("WORKERS", 1)
@@ -0,0 +1,3 @@
+-- user_info.username 유일 인덱스 추가(회원 가입 시 중복 확인 쿼리 없이 INSERT 한 번으로 처리)
+-- 기존 데이터에 같은 username이 있으면 먼저 정리해야 합니다.
+ALTER TABLE user_info ADD UNIQUE INDEX uq_user_info_username (username);
\ No newline at end of file
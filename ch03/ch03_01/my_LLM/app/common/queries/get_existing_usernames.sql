@@ -0,0 +1,3 @@
+SELECT username
+FROM user_info
+WHERE username IN %s;
\ No newline at end of file
@@ -1,3 +1,3 @@
-SELECT id, username, password, picture, last_login_at
+SELECT id, username, password, picture, privilege, last_login_at
 FROM user_info
 WHERE id=%s;
\ No newline at end of file
@@ -0,0 +1 @@
+UPDATE user_info SET password=%s WHERE id=%s;
\ No newline at end of file
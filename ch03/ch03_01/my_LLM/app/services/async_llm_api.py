@@ -3,6 +3,8 @@ import openai
 import asyncio
 import functools
 
+from app.utils.metrics import LLM_COMPLETION_RETRIES, LLM_COMPLETION_LATENCY
+
 
 #   yield control to an event loop
 class YieldToEventLoop:
@@ -21,30 +23,49 @@ async def asyncCompletion(
     retryCount = 0
     timeout = 45    # seconds
 
+    messages = [
+        {"role": 'system', "content": 'You are a helpful assistant. Please answer in Korean.'}
+        , {"role": 'user', "content": message}
+    ]
+
     while (response == None) and (time.time() < startTime + timeout) and (retryCount < maxRetries):
         try:
-            # LLM에 스트리밍 요청
-            # 이벤트 루프를 블로킹하지 않고, 동기 블로킹 호출을 스레드 풀에서 실행. 
-            # streaming=True일 때 동기 이터레이터(예, 리스트 등)가 반환됨. 따라서 완전한 비동기 스트리밍은 아님.
-            # loop = asyncio.get_event_loop()
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(
-                None
-                , functools.partial(
-                    client.chat.completions.create
-                    , model=modelName
-                    , messages=[
-                        {"role": 'system', "content": 'You are a helpful assistant. Please answer in Korean.'}
-                        , {"role": 'user', "content": message}
-                    ]
-                    , stream=streaming
+            remaining = max(startTime + timeout - time.time(), 0)
+
+            if isinstance(client, openai.AsyncOpenAI):
+                # 완전한 비동기 스트리밍
+                # AsyncOpenAI는 요청과 스트림 읽기 모두 이벤트 루프 위에서 비동기로 동작함.
+                # streaming=True일 때 비동기 이터레이터(AsyncStream)가 반환되므로 asyncSendChunk()로 전송.
+                response = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=modelName
+                        , messages=messages
+                        , stream=streaming
+                    )
+                    , timeout=remaining
+                )
+            else:
+                # LLM에 스트리밍 요청
+                # 이벤트 루프를 블로킹하지 않고, 동기 블로킹 호출을 스레드 풀에서 실행. 
+                # streaming=True일 때 동기 이터레이터(예, 리스트 등)가 반환됨. 따라서 완전한 비동기 스트리밍은 아님.
+                # loop = asyncio.get_event_loop()
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(
+                    None
+                    , functools.partial(
+                        client.chat.completions.create
+                        , model=modelName
+                        , messages=messages
+                        , stream=streaming
+                    )
                 )
-            )
+            LLM_COMPLETION_LATENCY.observe(time.time() - startTime)
             return response
         except asyncio.CancelledError:
             raise
         except Exception as e:
             retryCount = retryCount + 1
+            LLM_COMPLETION_RETRIES.inc()
             print('asyncCompletion().error (attempt {}):{}'.format(retryCount, e))
             
             if retryCount < maxRetries:
@@ -0,0 +1,108 @@
+import asyncio
+
+from app.services.async_llm_api import asyncCompletion
+from app.utils.text import normalizeText
+
+class Flight:
+    ''' 진행 중인 하나의 LLM 스트리밍 생성. 도착한 청크를 모든 구독자에게 전달합니다. '''
+    def __init__(self):
+        self.chunks = []            # 지금까지 도착한 청크(늦게 구독한 요청도 처음부터 재생)
+        self.fullResponse = ''
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.caches = {}            # collection name -> (semanticCache, message)
+        self.updated = asyncio.Event()
+        self.task = None
+
+    def notify(self):
+        updated, self.updated = self.updated, asyncio.Event()
+        updated.set()
+
+class SingleFlight:
+    ''' 같은 모델과 같은 프롬프트(정규화 기준)의 요청을 하나의 LLM 스트림으로 합칩니다.
+
+    첫 요청이 생성을 시작하고, 이후 같은 요청은 같은 토큰 스트림을 구독합니다.
+    생성이 끝나면 구독자들의 시맨틱 캐시 컬렉션마다 한 번씩 결과를 저장합니다.
+    구독자 하나가 취소되어도 남은 구독자가 있으면 생성은 계속됩니다.
+    '''
+    def __init__(self):
+        self.flights = {}   # (modelName, normalized prompt) -> Flight
+
+    async def stream(self, client, modelName, message, semanticCache=None):
+        ''' 청크(스트리밍 응답 객체)를 내보내는 비동기 이터레이터. asyncSendChunk()로 전송합니다. '''
+        key = (modelName, normalizeText(message))
+        flight = self.flights.get(key)
+
+        if flight is None:
+            flight = Flight()
+            self.flights[key] = flight
+            flight.task = asyncio.create_task(self.__drive(key, flight, client, modelName, message))
+        else:
+            print('SingleFlight.stream().joined in-flight generation:', key)
+
+        if semanticCache is not None and semanticCache.semanticCache.name not in flight.caches:
+            flight.caches[semanticCache.semanticCache.name] = (semanticCache, message)
+
+        flight.subscribers = flight.subscribers + 1
+        index = 0
+
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index = index + 1
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    break
+                else:
+                    await flight.updated.wait()
+        finally:
+            flight.subscribers = flight.subscribers - 1
+
+            # 마지막 구독자가 떠나면 생성을 중단
+            if flight.subscribers == 0 and not flight.done:
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+                flight.task.cancel()
+
+    async def __drive(self, key, flight, client, modelName, message):
+        response = None
+
+        try:
+            response = await asyncCompletion(client, modelName, message, True)
+            if response is None:
+                raise RuntimeError('LLM completion failed.')
+
+            async for chunk in response:
+                if len(chunk.choices) > 0 and chunk.choices[0].delta.content is not None:
+                    flight.fullResponse = flight.fullResponse + chunk.choices[0].delta.content
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            print('SingleFlight.__drive().generation cancelled:', key)
+            # LLM 서버와의 HTTP 스트림 연결을 닫아 생성을 중단시킴
+            if response is not None and hasattr(response, 'close'):
+                closing = response.close()
+                if asyncio.iscoroutine(closing):
+                    await closing
+            raise
+        except Exception as e:
+            print('SingleFlight.__drive().error:', e)
+            flight.error = e
+        finally:
+            flight.done = True
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+            flight.notify()
+
+        # 생성 완료 후 컬렉션마다 한 번만 캐시에 저장
+        if flight.error is None:
+            for semanticCache, cachedMessage in flight.caches.values():
+                try:
+                    await semanticCache.aadd(cachedMessage, flight.fullResponse)
+                except Exception as e:
+                    print('SingleFlight.__drive().addToCache error:', e)
+
+llmSingleFlight = SingleFlight()
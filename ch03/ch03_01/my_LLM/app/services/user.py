@@ -1,70 +1,198 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 import aiomysql
-from jose import JWTError, jwt
+from jose import jwt
 
 from app.utils.db import loadQuery
-from app.utils.crypto import encrypt, verify
+from app.utils.token_cache import VERIFIERS
+
+DUPLICATE_ENTRY = 1062    # MySQL ER_DUP_ENTRY
+
+rehashTasks = set()     # 실행 중인 로그인 재해시 작업(완료 전에 GC되지 않도록 참조 유지)
 
 class User():
     def __init__(self):
-        from app import pool
+        from app import pool, cryptoPool, userCache, tokenCache
 
         self.pool = pool
+        self.cryptoPool = cryptoPool    # bcrypt 작업은 프로세스 풀에서 실행
+        self.userCache = userCache      # user_info 행 캐시(read-through)
+        self.tokenCache = tokenCache    # 서명 검증을 마친 액세스 토큰 캐시
 
         from app import appCfg
 
         self.SECRET_KEY = appCfg.JWT_SECRET
         self.ALGORITHM = appCfg.JWT_ALGORITHM
+        self.verifyToken = VERIFIERS[appCfg.JWT_VERIFIER]
 
-    async def getUserInfoByName(self, username):
-        query = loadQuery("get_userinfo_by_username.sql")
+    async def __fetchUserInfo(self, queryName, param):
+        query = loadQuery(queryName)
 
         async with self.pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(query, (username,))
+                await cursor.execute(query, (param,))
 
             userInfo = await cursor.fetchone()
 
+        if userInfo is not None:
+            self.userCache.put(userInfo)
+
+        return userInfo
+
+    async def __getUserInfoByName(self, username):
+        userInfo = self.userCache.getByName(username)
+
+        if userInfo is None:
+            userInfo = await self.__fetchUserInfo("get_userinfo_by_username.sql", username)
+
+        return userInfo
+
+    async def __getUserInfoById(self, id):
+        userInfo = self.userCache.getById(id)
+
+        if userInfo is None:
+            userInfo = await self.__fetchUserInfo("get_userinfo_by_id.sql", id)
+
+        return userInfo
+
+    async def getUserInfoByName(self, username):
+        userInfo = await self.__getUserInfoByName(username)
+
         if userInfo is None:
             return None
         else:
             return userInfo
 
+    async def getUserInfoById(self, id):
+        return await self.__getUserInfoById(id)
+
     async def createUser(self, username, password):
-        encryptedPW = encrypt(password)
+        encryptedPW = await self.cryptoPool.encrypt(password)
         query = loadQuery("create_user.sql")
 
         currentTime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         async with self.pool.acquire() as conn:
-            async with conn.cursor() as cursor:
-                await cursor.execute(query, (username, encryptedPW, None, 0, currentTime))
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, (username, encryptedPW, None, 0, currentTime))
+            except aiomysql.IntegrityError as e:
+                # username 유일 인덱스(add_unique_username.sql) 위반: 같은 이름의 사용자가 있음
+                if e.args[0] == DUPLICATE_ENTRY:
+                    await conn.rollback()
+                    return None
+                raise
             
             await conn.commit()
 
             lastrowid = cursor.lastrowid    # lastrowid: primary key value of the table.
 
+        self.userCache.invalidate(id=lastrowid, username=username)
+
         return lastrowid
 
-    async def veryfyUserByName(self, username, password):
-        query = loadQuery("get_userinfo_by_username.sql")
+    async def createUsers(self, users, chunkSize=1000):
+        ''' 사용자 일괄 등록. users: [{"username": ..., "password": ...}, ...]
+        비밀번호는 모든 워커 프로세스에서 병렬로 해시하고, chunkSize 단위 트랜잭션으로 executemany 삽입합니다.
+        return: {"created": 등록된 수, "conflicts": [{"row": 입력 순번, "username": ..., "reason": ...}, ...]} '''
+        conflicts = []
+        candidates = []     # (row, username, password)
+        seen = set()
+
+        for row, user in enumerate(users):
+            username = user.get("username")
+            password = user.get("password")
+
+            if not username or not password:
+                conflicts.append({"row": row, "username": username, "reason": 'missing username or password'})
+            elif username in seen:
+                conflicts.append({"row": row, "username": username, "reason": 'duplicate username in input'})
+            else:
+                seen.add(username)
+                candidates.append((row, username, password))
 
-        async with self.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(query, (username,))
+        query = loadQuery("create_user.sql")
+        existsQuery = loadQuery("get_existing_usernames.sql")
+        currentTime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        created = 0
 
-            userInfo = await cursor.fetchone()
+        for start in range(0, len(candidates), chunkSize):
+            chunk = candidates[start:start + chunkSize]
+
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(existsQuery, ([username for _, username, _ in chunk],))
+
+                existingUsernames = {result[0] for result in await cursor.fetchall()}
+
+            newUsers = []
+            for row, username, password in chunk:
+                if username in existingUsernames:
+                    conflicts.append({"row": row, "username": username, "reason": 'already exists'})
+                else:
+                    newUsers.append((row, username, password))
+
+            if not newUsers:
+                continue
+
+            encryptedPWs = await self.cryptoPool.encryptMany([password for _, _, password in newUsers])
+            params = [(username, encryptedPW, None, 0, currentTime) for (_, username, _), encryptedPW in zip(newUsers, encryptedPWs)]
+
+            async with self.pool.acquire() as conn:
+                try:
+                    async with conn.cursor() as cursor:
+                        await cursor.executemany(query, params)
+
+                    await conn.commit()
+                    created = created + len(params)
+                except aiomysql.IntegrityError:
+                    await conn.rollback()
+
+                    # 동시에 등록된 사용자와 충돌: 행 단위로 다시 삽입하여 충돌한 행을 찾음
+                    for (row, username, _), param in zip(newUsers, params):
+                        try:
+                            async with conn.cursor() as cursor:
+                                await cursor.execute(query, param)
+
+                            await conn.commit()
+                            created = created + 1
+                        except aiomysql.IntegrityError:
+                            await conn.rollback()
+                            conflicts.append({"row": row, "username": username, "reason": 'already exists'})
+
+            for _, username, _ in newUsers:
+                self.userCache.invalidate(username=username)
+
+        conflicts.sort(key=lambda conflict: conflict["row"])
+
+        return {"created": created, "conflicts": conflicts}
+
+    async def veryfyUserByName(self, username, password):
+        userInfo = await self.__getUserInfoByName(username)
 
         if userInfo is None:
             return None
         else:
-            check = verify(password, userInfo["password"])
+            check = await self.cryptoPool.verify(password, userInfo["password"])
 
             if check:
+                # 이전 cost factor로 만든 해시는 로그인할 때 현재 설정으로 다시 해시
+                # 로그인 응답이 bcrypt 해시를 기다리지 않도록 백그라운드 작업으로 실행
+                if self.cryptoPool.needsRehash(userInfo["password"]):
+                    task = asyncio.create_task(self.__rehashPassword(userInfo["id"], password))
+                    rehashTasks.add(task)
+                    task.add_done_callback(rehashTasks.discard)
                 return userInfo
             else:
                 return None
 
+    async def __rehashPassword(self, id, password):
+        # 재해시는 best-effort: 실패해도(풀 포화, DB 오류) 로그인에는 영향이 없고 다음 로그인에서 다시 시도
+        try:
+            await self.updatePasswordById(id, password)
+        except Exception as e:
+            print('user.py.__rehashPassword().rehash error:', repr(e))
+
     # payload: {"id": '...', "username": '...', "picture": '...', "last_login_at": '...'}
     def createAccessToken(self, payload, duration=timedelta(hours=1)):
         expire = datetime.now(timezone.utc) + duration
@@ -76,27 +204,26 @@ class User():
         return accessToken
 
     def decodeAccessToken(self, token):
-        try:
-            return jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-        except JWTError:
-            return None
+        # 이미 검증한 토큰은 서명 검증 없이 캐시에서 반환
+        payload = self.tokenCache.get(token)
 
-    async def verifyUserById(self, id, password):
-        query = loadQuery("get_userinfo_by_id.sql")
+        if payload is None:
+            payload = self.verifyToken(token, self.SECRET_KEY, self.ALGORITHM)
+            if payload is not None:
+                self.tokenCache.put(token, payload)
 
-        async with self.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(query, (id,))
+        return payload
 
-            userInfo = await cursor.fetchone()
+    async def verifyUserById(self, id, password):
+        userInfo = await self.__getUserInfoById(id)
 
         if userInfo is None:
             return False
         else:
-            check = verify(password, userInfo["password"])
+            check = await self.cryptoPool.verify(password, userInfo["password"])
             return check
 
-    async def deleteUserById(self, id):
+    async def deleteUserById(self, id, username=None):
         query = loadQuery("delete_user_by_id.sql")
 
         async with self.pool.acquire() as conn:
@@ -104,3 +231,18 @@ class User():
                 await cursor.execute(query, (id,))
 
             await conn.commit()
+
+        # username으로도 무효화하여 삭제된 계정이 캐시에 남아 로그인되지 않도록 함
+        self.userCache.invalidate(id=id, username=username)
+
+    async def updatePasswordById(self, id, password):
+        encryptedPW = await self.cryptoPool.encrypt(password)
+        query = loadQuery("update_password_by_id.sql")
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, (encryptedPW, id))
+
+            await conn.commit()
+
+        self.userCache.invalidate(id=id)
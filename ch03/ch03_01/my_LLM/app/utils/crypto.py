@@ -1,14 +1,69 @@
-import bcrypt
+import os
+import math
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-def encrypt(secret):
-    secretBytes = secret.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashedSecret = bcrypt.hashpw(secretBytes, salt)
+# 워커 프로세스가 app 패키지 전체를 import 하지 않도록 bcrypt 함수는 최상위 모듈(crypto_worker.py)에 있음
+from crypto_worker import encrypt, verify, encryptBatch
 
-    return hashedSecret.decode('utf-8')
+def needsRehash(hashed, rounds):
+    ''' 해시의 cost factor가 현재 설정보다 낮으면 True. 해시 형식: $2b$<cost>$<salt+hash> '''
+    try:
+        return int(hashed.split('$')[2]) < rounds
+    except (IndexError, ValueError):
+        return True
 
-def verify(secret, hashed):
-    secretBytes = secret.encode('utf-8')
-    hashedBytes = hashed.encode('utf-8')
+class CryptoPoolFullError(Exception):
+    pass
 
-    return bcrypt.checkpw(secretBytes, hashedBytes)
+class CryptoPool:
+    ''' bcrypt 해시/검증을 프로세스 풀에서 실행하여 이벤트 루프를 블로킹하지 않습니다.
+
+    대기 중인 작업이 maxWorkers + maxQueueSize에 도달하면 기다리지 않고 CryptoPoolFullError를 발생시킵니다.
+    '''
+    def __init__(self, maxWorkers=None, maxQueueSize=64, rounds=12):
+        self.maxWorkers = maxWorkers if maxWorkers is not None else (os.cpu_count() or 1)
+        # 이벤트 루프, executor 스레드, onnxruntime 스레드가 실행 중인 프로세스를 fork하지 않도록 spawn으로 워커를 생성
+        self.executor = ProcessPoolExecutor(max_workers=self.maxWorkers, mp_context=multiprocessing.get_context('spawn'))
+        self.maxQueueSize = maxQueueSize
+        self.rounds = rounds    # bcrypt cost factor
+        self.pending = 0
+
+    async def __submit(self, func, *args):
+        if self.pending >= self.maxWorkers + self.maxQueueSize:
+            raise CryptoPoolFullError('Too many pending password operations.')
+
+        self.pending = self.pending + 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending = self.pending - 1
+
+    async def encrypt(self, secret):
+        return await self.__submit(encrypt, secret, self.rounds)
+
+    async def verify(self, secret, hashed):
+        return await self.__submit(verify, secret, hashed)
+
+    async def encryptMany(self, secrets):
+        ''' 일괄 등록용: 작업을 나누어 모든 워커 프로세스에서 병렬로 해시합니다. 대기열 제한은 적용하지 않습니다. '''
+        if not secrets:
+            return []
+
+        sliceSize = math.ceil(len(secrets) / (self.maxWorkers * 4))
+        slices = [secrets[i:i + sliceSize] for i in range(0, len(secrets), sliceSize)]
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, encryptBatch, secretSlice, self.rounds) for secretSlice in slices
+        ])
+
+        return [hashed for result in results for hashed in result]
+
+    def needsRehash(self, hashed):
+        return needsRehash(hashed, self.rounds)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -1,8 +1,156 @@
 import os
+import time
+import asyncio
+
+from app.utils.metrics import DB_POOL_ACQUIRE_LATENCY
+
+# 실행 위치(cwd)와 관계없이 패키지 기준으로 쿼리 디렉터리를 찾음
+QUERY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'common', 'queries')
+
+# 앱이 loadQuery()로 사용하는 쿼리. 하나라도 없으면 load()가 실패하여 앱 시작이 중단됨
+REQUIRED_QUERIES = [
+    'create_user.sql'
+    , 'delete_user_by_id.sql'
+    , 'get_existing_usernames.sql'
+    , 'get_userinfo_by_id.sql'
+    , 'get_userinfo_by_username.sql'
+    , 'update_password_by_id.sql'
+]
+
+class QueryRegistry():
+    ''' app/common/queries의 .sql 파일을 시작할 때 한 번 읽어 이름으로 제공합니다.
+
+    hotReload=True(개발 모드)이면 조회할 때 파일 변경 시간을 확인하여 바뀐 쿼리를 다시 읽습니다.
+    '''
+    def __init__(self, queryDir=QUERY_DIR, requiredQueries=REQUIRED_QUERIES):
+        self.queryDir = queryDir
+        self.requiredQueries = requiredQueries
+        self.hotReload = False
+        self.queries = {}   # fileName -> (query, mtime)
+
+    def load(self, hotReload=False):
+        self.hotReload = hotReload
+        queries = {}
+
+        for fileName in sorted(os.listdir(self.queryDir)):
+            if fileName.endswith('.sql'):
+                queries[fileName] = self.__read(fileName)
+
+        missing = [fileName for fileName in self.requiredQueries if fileName not in queries]
+        if missing:
+            raise FileNotFoundError('Required queries not found: {} in {}'.format(missing, self.queryDir))
+
+        self.queries = queries
+        print('db.py.QueryRegistry.load().queries:', list(self.queries.keys()))
+
+    def __read(self, fileName):
+        filePath = os.path.join(self.queryDir, fileName)
+        with open(filePath, 'r') as fp:
+            query = fp.read()
+
+        return (query, os.path.getmtime(filePath))
+
+    def get(self, fileName):
+        if not self.queries:
+            self.load(self.hotReload)
+
+        if self.hotReload:
+            filePath = os.path.join(self.queryDir, fileName)
+            if os.path.exists(filePath):
+                if fileName not in self.queries or self.queries[fileName][1] != os.path.getmtime(filePath):
+                    self.queries[fileName] = self.__read(fileName)
+            else:
+                self.queries.pop(fileName, None)
+
+        if fileName not in self.queries:
+            raise KeyError('Query not found: {} in {}'.format(fileName, self.queryDir))
+
+        return self.queries[fileName][0]
+
+queryRegistry = QueryRegistry()
 
 def loadQuery(fileName):
-    filePath = os.path.join('app', 'common', 'queries', fileName)
-    with open(filePath, 'r') as fp:
-        query = fp.read()
+    return queryRegistry.get(fileName)
+
+# 커넥션 획득 대기 시간 히스토그램 구간(ms)
+ACQUIRE_BUCKETS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+class ObservedPool():
+    ''' aiomysql 커넥션 풀을 감싸 사용 중/유휴 커넥션 수, 대기 수, 획득 대기 시간을 기록합니다.
+    acquire()는 aiomysql 풀과 같이 async with로 사용합니다.
+    '''
+    def __init__(self, pool):
+        self.pool = pool
+        self.waiters = 0
+        self.acquireCount = 0
+        self.acquireTimeSum = 0.0   # seconds
+        self.acquireBuckets = [0] * (len(ACQUIRE_BUCKETS) + 1)  # 마지막 구간: +Inf
+
+    def acquire(self):
+        return ObservedAcquire(self)
+
+    def recordAcquire(self, elapsed):
+        DB_POOL_ACQUIRE_LATENCY.observe(elapsed)
+        self.acquireCount = self.acquireCount + 1
+        self.acquireTimeSum = self.acquireTimeSum + elapsed
+
+        elapsedMs = elapsed * 1000
+        for i, bound in enumerate(ACQUIRE_BUCKETS):
+            if elapsedMs <= bound:
+                self.acquireBuckets[i] = self.acquireBuckets[i] + 1
+                break
+        else:
+            self.acquireBuckets[-1] = self.acquireBuckets[-1] + 1
+
+    async def warmup(self):
+        ''' minsize만큼 커넥션을 동시에 꺼내 확인(ping)하여 첫 요청의 연결 지연을 없앱니다. '''
+        conns = []
+        try:
+            for _ in range(self.pool.minsize):
+                conns.append(await self.pool.acquire())
+            await asyncio.gather(*[conn.ping() for conn in conns])
+        finally:
+            for conn in conns:
+                await self.pool.release(conn)
+
+    def getStats(self):
+        return {
+            "size": self.pool.size
+            , "in_use": self.pool.size - self.pool.freesize
+            , "free": self.pool.freesize
+            , "minsize": self.pool.minsize
+            , "maxsize": self.pool.maxsize
+            , "waiters": self.waiters
+            , "acquire_count": self.acquireCount
+            , "acquire_time_sum_seconds": self.acquireTimeSum
+            , "acquire_time_buckets_ms": {
+                **{str(bound): count for bound, count in zip(ACQUIRE_BUCKETS, self.acquireBuckets)}
+                , "+Inf": self.acquireBuckets[-1]
+            }
+        }
+
+    def close(self):
+        self.pool.close()
+
+    async def wait_closed(self):
+        await self.pool.wait_closed()
+
+class ObservedAcquire():
+    def __init__(self, observedPool):
+        self.observedPool = observedPool
+        self.conn = None
+
+    async def __aenter__(self):
+        startTime = time.perf_counter()
+        self.observedPool.waiters = self.observedPool.waiters + 1
+        try:
+            self.conn = await self.observedPool.pool.acquire()
+        finally:
+            self.observedPool.waiters = self.observedPool.waiters - 1
+            self.observedPool.recordAcquire(time.perf_counter() - startTime)
+
+        return self.conn
 
-    return query
+    async def __aexit__(self, excType, exc, tb):
+        await self.observedPool.pool.release(self.conn)
+        self.conn = None
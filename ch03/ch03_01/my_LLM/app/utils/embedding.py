@@ -0,0 +1,130 @@
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+from app.utils.text import hashText
+
+class BatchedEmbeddingFunction:
+    """시맨틱 캐시용 임베딩 함수. 동시에 들어온 요청을 짧은 시간(batchWindow) 동안 모아 한 번에 계산하고,
+    계산한 임베딩은 텍스트 해시를 키로 LRU에 저장하여 같은 텍스트를 다시 계산하지 않습니다.
+
+    embeddingFunction을 지정하지 않으면 Chroma 기본 임베딩(all-MiniLM-L6-v2)을 CPU에서 실행합니다.
+    Chroma의 EmbeddingFunction처럼 텍스트 리스트를 받아 임베딩 리스트를 반환합니다.
+    """
+    def __init__(self, embeddingFunction=None, maxBatchSize=32, batchWindow=0.005, cacheSize=4096):
+        if embeddingFunction is None:
+            # 기존 컬렉션과 같은 벡터 공간을 쓰도록 Chroma 기본 모델을 CPU 전용으로 사용
+            embeddingFunction = ONNXMiniLM_L6_V2(preferred_providers=['CPUExecutionProvider'])
+
+        self.embeddingFunction = embeddingFunction
+        self.maxBatchSize = maxBatchSize
+        self.batchWindow = batchWindow  # seconds
+        self.cacheSize = cacheSize
+
+        self.requests = queue.Queue()   # (text hash, text, Future)
+        self.worker = None
+        self.lock = threading.Lock()
+        self.memo = OrderedDict()       # text hash -> embedding (LRU 순서)
+        self.inFlight = {}              # text hash -> Future, 계산 중인 같은 텍스트는 함께 기다림
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def __call__(self, input):
+        return self.embed(input)
+
+    def embed(self, texts):
+        results = [None] * len(texts)
+        waiting = []
+
+        with self.lock:
+            for i, text in enumerate(texts):
+                key = hashText(text)
+                embedding = self.memo.get(key)
+
+                if embedding is not None:
+                    self.memo.move_to_end(key)
+                    self.hits = self.hits + 1
+                    results[i] = embedding
+                else:
+                    self.misses = self.misses + 1
+                    future = self.inFlight.get(key)
+                    if future is None:
+                        future = Future()
+                        self.inFlight[key] = future
+                        self.requests.put((key, text, future))
+                    waiting.append((i, future))
+
+            if waiting and self.worker is None:
+                self.worker = threading.Thread(target=self.__run, name='embedding-batcher', daemon=True)
+                self.worker.start()
+
+        for i, future in waiting:
+            results[i] = future.result()
+
+        return results
+
+    def __run(self):
+        while True:
+            first = self.requests.get()
+            if first is None:   # close()
+                break
+
+            # batchWindow 동안 또는 maxBatchSize까지 요청을 모음
+            batch = [first]
+            deadline = time.monotonic() + self.batchWindow
+            while len(batch) < self.maxBatchSize:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.requests.put(None)     # 현재 배치를 처리한 뒤 종료
+                    break
+                batch.append(item)
+
+            try:
+                embeddings = self.embeddingFunction([text for _, text, _ in batch])
+            except Exception as e:
+                with self.lock:
+                    for key, _, future in batch:
+                        self.inFlight.pop(key, None)
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self.lock:
+                self.batches = self.batches + 1
+                for (key, _, _), embedding in zip(batch, embeddings):
+                    self.memo[key] = embedding
+                    self.memo.move_to_end(key)
+                    self.inFlight.pop(key, None)
+                while len(self.memo) > self.cacheSize:
+                    self.memo.popitem(last=False)
+
+            for (_, _, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "hits": self.hits
+                , "misses": self.misses
+                , "batches": self.batches
+                , "memo_size": len(self.memo)
+            }
+
+    def close(self):
+        if self.worker is not None:
+            self.requests.put(None)
+            self.worker.join()
+            self.worker = None
@@ -0,0 +1,78 @@
+# 채팅 파이프라인 지표(Prometheus). /metrics에서 text 형식으로 제공합니다.
+# pip install prometheus-client
+#
+# 워커 프로세스가 여러 개(WORKERS > 1)이면 run.py가 PROMETHEUS_MULTIPROC_DIR을 설정하고, 각 워커는 지표를 그 디렉터리의
+# 파일에 기록합니다. /metrics는 어느 워커가 응답하든 모든 워커의 값을 합쳐서 반환합니다.
+# Gauge는 살아 있는 워커의 값만 합산(livesum)하며, 이 환경 변수는 prometheus_client를 import 하기 전에 설정해야 합니다.
+
+import os
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, generate_latest, multiprocess
+
+# asyncCompletion()
+LLM_COMPLETION_RETRIES = Counter(
+    'llm_completion_retries_total', 'Retries of LLM completion requests in asyncCompletion')
+LLM_COMPLETION_LATENCY = Histogram(
+    'llm_completion_latency_seconds', 'Time until asyncCompletion returns a response (stream opened)'
+    , buckets=[0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45])
+
+# sendChunk(), asyncSendChunk()
+CHAT_TTFT = Histogram(
+    'chat_ttft_seconds', 'Time from the start of sending a streamed response to its first token'
+    , buckets=[0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20])
+CHAT_TOKENS_PER_TURN = Histogram(
+    'chat_tokens_per_turn', 'Streamed chunks (tokens) sent per chat turn'
+    , buckets=[10, 25, 50, 100, 250, 500, 1000, 2000, 4000])
+
+# SemanticCache
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    'semantic_cache_lookups_total', 'Semantic cache lookups by result', ['result'])    # exact, similar, miss
+SEMANTIC_CACHE_LOOKUP_LATENCY = Histogram(
+    'semantic_cache_lookup_seconds', 'Semantic cache lookup latency (including executor queueing)'
+    , buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1])
+SEMANTIC_CACHE_DISTANCE = Histogram(
+    'semantic_cache_distance', 'Distance of the nearest cached query'
+    , buckets=[0, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2])
+SEMANTIC_CACHE_L1_LOOKUPS = Counter(
+    'semantic_cache_l1_lookups_total', 'In-process exact-match (L1) cache lookups by result', ['result'])    # hit, miss
+
+# SemanticCacheExecutor: Chroma 호출 전용 스레드 풀
+SEMANTIC_CACHE_EXECUTOR_QUEUE_DEPTH = Gauge(
+    'semantic_cache_executor_queue_depth', 'Chroma calls submitted to the executor but not yet running'
+    , multiprocess_mode='livesum')
+SEMANTIC_CACHE_EXECUTOR_IN_FLIGHT = Gauge(
+    'semantic_cache_executor_in_flight', 'Chroma calls running on executor threads'
+    , multiprocess_mode='livesum')
+SEMANTIC_CACHE_EXECUTOR_LATENCY = Histogram(
+    'semantic_cache_executor_seconds', 'Chroma call latency on the executor (including queueing) by call', ['call']
+    , buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5])
+
+# chat()
+CHAT_ACTIVE_WEBSOCKETS = Gauge(
+    'chat_active_websockets', 'Open /chat websocket connections'
+    , multiprocess_mode='livesum')
+CHAT_MESSAGE_QUEUE_DEPTH = Gauge(
+    'chat_message_queue_depth', 'Messages waiting in chat message queues (all connections)'
+    , multiprocess_mode='livesum')
+
+# DB 커넥션 풀
+DB_POOL_ACQUIRE_LATENCY = Histogram(
+    'db_pool_acquire_seconds', 'Time to acquire a connection from the aiomysql pool'
+    , buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5])
+
+def isMultiprocess():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+def generateMetrics():
+    ''' Prometheus text 형식의 지표. 멀티프로세스 모드이면 모든 워커의 값을 합침. '''
+    if isMultiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+
+    return generate_latest(REGISTRY)
+
+def markProcessDead(pid=None):
+    ''' 워커가 종료될 때 호출. 종료된 워커의 Gauge 값이 합산되지 않도록 파일을 정리함. '''
+    if isMultiprocess():
+        multiprocess.mark_process_dead(pid if pid is not None else os.getpid())
@@ -1,25 +1,224 @@
 import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from chromadb import PersistentClient
+from chromadb import PersistentClient, HttpClient
+from chromadb.errors import ChromaError
+
+from app.utils.embedding import BatchedEmbeddingFunction
+from app.utils.text import normalizeText, hashText
+from app.utils.metrics import (
+    SEMANTIC_CACHE_EXECUTOR_QUEUE_DEPTH, SEMANTIC_CACHE_EXECUTOR_IN_FLIGHT, SEMANTIC_CACHE_EXECUTOR_LATENCY
+    , SEMANTIC_CACHE_L1_LOOKUPS
+)
+
+class SemanticCacheExecutor:
+    """Chroma 호출(임베딩 계산, SQLite/HNSW I/O)을 이벤트 루프 밖의 전용 스레드에서 실행합니다.
+
+    동시에 제출될 수 있는 호출 수는 maxWorkers + maxQueueSize로 제한되며,
+    이를 넘으면 호출자는 자리가 날 때까지 대기합니다.
+    """
+    def __init__(self, maxWorkers=4, maxQueueSize=64):
+        self.maxWorkers = maxWorkers
+        self.maxQueueSize = maxQueueSize
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix='semantic-cache')
+        self.slots = None   # asyncio.Semaphore, 이벤트 루프 안에서 생성
+        self.lock = threading.Lock()
+
+        # metrics
+        self.queueDepth = 0     # 제출되었지만 아직 실행되지 않은 호출 수
+        self.inFlight = 0       # 실행 중인 호출 수
+        self.latencies = {}     # name -> {"count", "total", "max", "last"} (seconds)
+
+    async def run(self, name, func, *args):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.maxWorkers + self.maxQueueSize)
+
+        async with self.slots:
+            submittedTime = time.perf_counter()
+            with self.lock:
+                self.queueDepth = self.queueDepth + 1
+            SEMANTIC_CACHE_EXECUTOR_QUEUE_DEPTH.inc()
+
+            def task():
+                with self.lock:
+                    self.queueDepth = self.queueDepth - 1
+                    self.inFlight = self.inFlight + 1
+                SEMANTIC_CACHE_EXECUTOR_QUEUE_DEPTH.dec()
+                SEMANTIC_CACHE_EXECUTOR_IN_FLIGHT.inc()
+                try:
+                    return func(*args)
+                finally:
+                    with self.lock:
+                        self.inFlight = self.inFlight - 1
+                    SEMANTIC_CACHE_EXECUTOR_IN_FLIGHT.dec()
+
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self.executor, task)
+            finally:
+                self.__recordLatency(name, time.perf_counter() - submittedTime)
+
+    def __recordLatency(self, name, elapsed):
+        SEMANTIC_CACHE_EXECUTOR_LATENCY.labels(call=name).observe(elapsed)
+        with self.lock:
+            stat = self.latencies.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            stat["count"] = stat["count"] + 1
+            stat["total"] = stat["total"] + elapsed
+            stat["max"] = max(stat["max"], elapsed)
+            stat["last"] = elapsed
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "queue_depth": self.queueDepth
+                , "in_flight": self.inFlight
+                , "max_workers": self.maxWorkers
+                , "max_queue_size": self.maxQueueSize
+                , "latency": {name: dict(stat) for name, stat in self.latencies.items()}
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+class ExactMatchCache:
+    """Chroma 앞단의 프로세스 내 L1 캐시(완전 일치). 크기 제한 LRU이며 TTL이 지난 항목은 조회하지 않습니다.
+
+    키는 (컬렉션 이름, 정규화된 질의(NFC, 공백 정리)의 해시)입니다.
+    """
+    def __init__(self, maxSize=10000):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()    # (collectionName, query hash) -> (response, timestamp)
+        self.lock = threading.Lock()
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def makeKey(collectionName, query):
+        return (collectionName, hashText(normalizeText(query)))
+
+    def get(self, collectionName, query, ttl):
+        key = self.makeKey(collectionName, query)
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None and entry[1] < int(time.time()) - ttl:
+                del self.entries[key]   # 만료
+                entry = None
+
+            if entry is None:
+                self.misses = self.misses + 1
+                SEMANTIC_CACHE_L1_LOOKUPS.labels(result='miss').inc()
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits = self.hits + 1
+            SEMANTIC_CACHE_L1_LOOKUPS.labels(result='hit').inc()
+            return entry[0]
+
+    def put(self, collectionName, query, response, timestamp):
+        key = self.makeKey(collectionName, query)
+
+        with self.lock:
+            self.entries[key] = (response, timestamp)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+
+    def deleteExpired(self, ttl):
+        expiredTime = int(time.time()) - ttl
+
+        with self.lock:
+            expiredKeys = [key for key, (_, timestamp) in self.entries.items() if timestamp < expiredTime]
+            for key in expiredKeys:
+                del self.entries[key]
+
+    def getStats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits
+                , "misses": self.misses
+                , "hit_ratio": self.hits / total if total > 0 else 0.0
+                , "size": len(self.entries)
+            }
+
+class CollectionStats:
+    """컬렉션 하나의 통계. 핸들(SemanticCache)이 LRU에서 제거되어 다시 만들어지거나 sweeper가 임시 핸들을 만들어도
+    같은 컬렉션이면 레지스트리에 있는 이 객체 하나를 함께 갱신합니다."""
+    def __init__(self):
+        self.values = None   # {"count", "latest_timestamp", "bytes"}, 처음 필요할 때 한 번만 계산하고 이후 add/delete 시 갱신
+        self.lock = threading.RLock()  # 쓰기와 통계 갱신을 함께 묶어 통계 계산 중 중복 집계를 막음
 
 class SemanticCache:
     # for customized collection for each user
-    def __init__(self, collectionName='default_collection'):
+    def __init__(self, collectionName='default_collection', chromaClient=None, executor=None, ttl=7*24*60*60, embeddingFunction=None, exactMatchCache=None, shared=False, collectionStats=None):
         print('SemanticCache.__init__().collectionName:', collectionName)
-        self.chromaClient = PersistentClient(path='app/chromadb/save')
+        if chromaClient is None:
+            chromaClient = semanticCacheRegistry.getClient()   # 프로세스에서 공유하는 클라이언트
+        if executor is None:
+            executor = semanticCacheRegistry.executor
+        if embeddingFunction is None:
+            embeddingFunction = semanticCacheRegistry.embeddingFunction
+        if exactMatchCache is None:
+            exactMatchCache = semanticCacheRegistry.exactMatchCache
+        if collectionStats is None:
+            collectionStats = semanticCacheRegistry.getCollectionStats(collectionName)
+        self.chromaClient = chromaClient
+        self.executor = executor
+        self.embeddingFunction = embeddingFunction  # 조회와 저장에서 같은 임베딩을 재사용(memoized)
+        self.exactMatchCache = exactMatchCache      # L1: 완전 일치는 Chroma를 거치지 않음
         self.semanticCache = self.chromaClient.create_collection(name=collectionName, get_or_create=True)
-        self.SECONDS_IN_WEEK = 7*24*60*60
+        self.ttl = ttl  # seconds, 만료된 항목은 조회에서 제외되고 백그라운드 sweeper가 삭제
+
+        # 컬렉션 통계: 같은 컬렉션의 모든 핸들과 sweeper가 레지스트리의 같은 객체를 갱신
+        self.collectionStats = collectionStats
+        self.shared = shared    # 다른 워커 프로세스도 같은 컬렉션에 쓰는 경우(Chroma 서버 모드)
+
+    # 비동기 API: 동기 Chroma 호출을 전용 executor에서 실행하여 이벤트 루프를 블로킹하지 않음
+    async def aquery(self, query):
+        return await self.executor.run('query', self.queryToCache, query)
+
+    async def aadd(self, query, response):
+        return await self.executor.run('add', self.addToCache, query, response)
+
+    async def ainfo(self):
+        return await self.executor.run('info', self.getCollectionInfo)
 
     def addToCache(self, query, response):
         currentTimestamp = int(time.time())
         metadatas = {"response": response, "timestamp": currentTimestamp}
-        self.semanticCache.add(documents=[query], metadatas=[metadatas], ids=[query])
+        # 만료되었지만 아직 삭제되지 않은 같은 id의 항목이 있을 수 있으므로 upsert
+        with self.collectionStats.lock:
+            embeddings = self.embeddingFunction([query])    # 조회할 때 계산한 임베딩을 재사용
+
+            if self.collectionStats.values is not None:
+                # 통계 갱신을 위해 덮어쓸 항목을 먼저 조회
+                existing = self.semanticCache.get(ids=[query], include=["documents", "metadatas"])
+                self.semanticCache.upsert(documents=[query], metadatas=[metadatas], ids=[query], embeddings=embeddings)
+                self.__updateStats(existing["documents"], existing["metadatas"], [query], [metadatas])
+            else:
+                self.semanticCache.upsert(documents=[query], metadatas=[metadatas], ids=[query], embeddings=embeddings)
+
+        self.exactMatchCache.put(self.semanticCache.name, query, response, currentTimestamp)
 
     def queryToCache(self, query):
-        oneWeekAgo = int(time.time()) - self.SECONDS_IN_WEEK
+        oneWeekAgo = int(time.time()) - self.ttl
 
-        results = self.semanticCache.get(ids=[query])   # exact match
+        cachedResponse = self.exactMatchCache.get(self.semanticCache.name, query, self.ttl)    # L1 exact match
+        if cachedResponse is not None:
+            print('semanticCache.queryToCache.value: {}'.format('L1 exact match.'))
+            return {"distance": 0, "response": cachedResponse}
+
+        results = self.semanticCache.get(
+            ids=[query]
+            , where={"timestamp": {"$gte": oneWeekAgo}})   # exact match
         print('semanticCache.semanticCache.get(ids=[{}]).results: {}'.format(query, results))
 
         value = None
@@ -27,12 +226,18 @@ class SemanticCache:
         if len(results["documents"]) > 0:
             print('self.semanticCache.get.results: {}'.format('exact match.'))
             value = {"distance": 0, "response": results["metadatas"][0]["response"]}
+            self.exactMatchCache.put(self.semanticCache.name, query, value["response"], results["metadatas"][0]["timestamp"])
         else:
-            results = self.semanticCache.query(
-                query_texts=[query]
-                , n_results=1
-                , where={"timestamp": {"$gte": oneWeekAgo}})    # similar match
-            print('self.semanticCache.query(query_texts=[{}], n_results=1, where={{"timestamp": {{"$gte": {}}}}}).results: {}'.format(query, oneWeekAgo, results))
+            try:
+                results = self.semanticCache.query(
+                    query_embeddings=self.embeddingFunction([query])
+                    , n_results=1
+                    , where={"timestamp": {"$gte": oneWeekAgo}})    # similar match
+            except ChromaError as e:
+                # 다른 워커가 같은 컬렉션에 쓰는 중이면 Chroma 서버가 일시적으로 오류를 반환할 수 있음. 캐시 miss로 처리
+                print('semanticCache.queryToCache().similar match error:', repr(e))
+                return None
+            print('self.semanticCache.query(query_embeddings=embed([{}]), n_results=1, where={{"timestamp": {{"$gte": {}}}}}).results: {}'.format(query, oneWeekAgo, results))
 
             if len(results["documents"]) > 0 and len(results["documents"][0]) > 0:
                 print('self.semanticCache.get.results: {}'.format('similar match.'))
@@ -42,38 +247,94 @@ class SemanticCache:
 
         print('semanticCache.queryToCache.value: {}'.format(value))
 
-        self.__deleteOldSemantics(self.SECONDS_IN_WEEK)
-
         return value
 
-    def __deleteOldSemantics(self, timeInSeconds):
+    def deleteOldSemantics(self, timeInSeconds):
         oneWeekAgo = int(time.time()) - timeInSeconds
-        self.semanticCache.delete(where={"timestamp": {"$lt": oneWeekAgo}})
+        where = {"timestamp": {"$lt": oneWeekAgo}}
+
+        with self.collectionStats.lock:
+            if self.collectionStats.values is not None:
+                # 통계 갱신을 위해 삭제될 항목(만료된 항목만)을 먼저 조회
+                expired = self.semanticCache.get(where=where, include=["documents", "metadatas"])
+                self.semanticCache.delete(where=where)
+                self.__updateStats(expired["documents"], expired["metadatas"], [], [])
+            else:
+                self.semanticCache.delete(where=where)
+
+    @staticmethod
+    def __entryBytes(document, metadata):
+        return len(document.encode('utf-8')) + len(metadata["response"].encode('utf-8'))
+
+    def __loadStats(self, batchSize=1000):
+        """컬렉션을 한 번 훑어 통계를 계산합니다. 핸들을 만든 뒤 처음 한 번만 실행됩니다."""
+        count = 0
+        latestTimestamp = 0
+        totalBytes = 0
+        offset = 0
+
+        while True:
+            results = self.semanticCache.get(include=["documents", "metadatas"], limit=batchSize, offset=offset)
+            if not results["ids"]:
+                break
+            for document, metadata in zip(results["documents"], results["metadatas"]):
+                count = count + 1
+                latestTimestamp = max(latestTimestamp, metadata["timestamp"])
+                totalBytes = totalBytes + self.__entryBytes(document, metadata)
+            offset = offset + len(results["ids"])
+
+        return {"count": count, "latest_timestamp": latestTimestamp, "bytes": totalBytes}
+
+    def __updateStats(self, removedDocuments, removedMetadatas, addedDocuments, addedMetadatas):
+        with self.collectionStats.lock:
+            stats = self.collectionStats.values
+            if stats is None:
+                return  # 아직 계산되지 않음. 처음 조회할 때 전체를 계산함
+
+            for document, metadata in zip(removedDocuments, removedMetadatas):
+                stats["count"] = stats["count"] - 1
+                stats["bytes"] = stats["bytes"] - self.__entryBytes(document, metadata)
+
+            for document, metadata in zip(addedDocuments, addedMetadatas):
+                stats["count"] = stats["count"] + 1
+                stats["bytes"] = stats["bytes"] + self.__entryBytes(document, metadata)
+                stats["latest_timestamp"] = max(stats["latest_timestamp"], metadata["timestamp"])
+
+            # 만료 삭제는 가장 오래된 항목만 지우므로 최신 타임스탬프는 컬렉션이 비었을 때만 바뀜
+            if stats["count"] <= 0:
+                self.collectionStats.values = {"count": 0, "latest_timestamp": 0, "bytes": 0}
 
     def getCollectionInfo(self):
         """컬렉션의 상세 정보를 반환합니다."""
         try:
-            results = self.semanticCache.get()
-            print('semantic_cache.py.getCollectionInfo().result:', results)
+            if self.shared:
+                # 여러 워커가 같은 컬렉션에 쓰므로 프로세스 안에서 갱신하는 통계는 정확하지 않음.
+                # 전체를 다시 읽지 않고 항목 수만 Chroma 서버에서 조회(최신 타임스탬프, 크기는 제공하지 않음)
+                stats = {"count": self.semanticCache.count(), "latest_timestamp": None, "bytes": None}
+            else:
+                # 전체 문서를 읽지 않고 add/delete 시 갱신되는 통계를 사용
+                with self.collectionStats.lock:
+                    if self.collectionStats.values is None:
+                        self.collectionStats.values = self.__loadStats()
+                    stats = dict(self.collectionStats.values)
+            print('semantic_cache.py.getCollectionInfo().stats:', stats)
 
-            count = len(results["ids"]) if results["ids"] else 0
+            count = stats["count"]
             
             # 최신 타임스탬프 확인
-            latest_timestamp = 0
+            latest_timestamp = stats["latest_timestamp"]
             latest_timestamp_readable = "N/A"
-            if results["metadatas"]:
-                timestamps = [meta["timestamp"] for meta in results["metadatas"]]
-                latest_timestamp = max(timestamps) if timestamps else 0
                 
-                # Unix 타임스탬프를 사람이 읽기 쉬운 형식으로 변환
-                if latest_timestamp > 0:
-                    dt = datetime.fromtimestamp(latest_timestamp)
-                    latest_timestamp_readable = dt.strftime("%Y%m%d-%H%M%S")
+            # Unix 타임스탬프를 사람이 읽기 쉬운 형식으로 변환
+            if latest_timestamp:
+                dt = datetime.fromtimestamp(latest_timestamp)
+                latest_timestamp_readable = dt.strftime("%Y%m%d-%H%M%S")
             
             return {
                 "total_records": count,
                 "latest_timestamp": latest_timestamp,
                 "latest_timestamp_YMDHMS": latest_timestamp_readable,
+                "total_bytes": stats["bytes"],
                 "collection_name": self.semanticCache.name
             }
         except Exception as e:
@@ -82,5 +343,98 @@ class SemanticCache:
                 "total_records": 0, 
                 "latest_timestamp": 0, 
                 "latest_timestamp_YMDHMS": "N/A",
+                "total_bytes": 0,
                 "collection_name": "unknown"
             }
+
+class SemanticCacheRegistry:
+    """Chroma 클라이언트를 프로세스당 한 번만 열고, 사용자별 SemanticCache를 LRU로 재사용합니다."""
+    def __init__(self, path='app/chromadb/save', maxCollections=128, maxWorkers=4, maxQueueSize=64, ttl=7*24*60*60, embeddingFunction=None, maxExactMatches=10000):
+        self.path = path
+        self.backend = 'embedded'   # 'embedded': 프로세스 내 PersistentClient, 'http': Chroma 서버(여러 워커가 공유)
+        self.host = 'localhost'
+        self.port = 8001
+        self.maxCollections = maxCollections
+        self.ttl = ttl  # seconds
+        self.chromaClient = None
+        self.executor = SemanticCacheExecutor(maxWorkers, maxQueueSize)
+        self.embeddingFunction = embeddingFunction if embeddingFunction is not None else BatchedEmbeddingFunction()
+        self.exactMatchCache = ExactMatchCache(maxExactMatches)
+        self.caches = OrderedDict()     # collectionName -> SemanticCache (LRU 순서)
+        self.collectionStats = {}       # collectionName -> CollectionStats, 핸들을 제거해도 유지
+        self.lock = threading.RLock()
+
+    def getClient(self):
+        with self.lock:
+            if self.chromaClient is None:
+                if self.backend == 'http':
+                    # 저장소는 Chroma 서버 프로세스 하나가 소유하고 모든 워커가 HTTP로 접근
+                    # 서버 실행: chroma run --path app/chromadb/save --port 8001
+                    self.chromaClient = HttpClient(host=self.host, port=self.port)
+                else:
+                    self.chromaClient = PersistentClient(path=self.path)
+            return self.chromaClient
+
+    def getCollectionStats(self, collectionName):
+        with self.lock:
+            collectionStats = self.collectionStats.get(collectionName)
+            if collectionStats is None:
+                collectionStats = CollectionStats()
+                self.collectionStats[collectionName] = collectionStats
+            return collectionStats
+
+    def getSemanticCache(self, collectionName='default_collection'):
+        with self.lock:
+            semanticCache = self.caches.get(collectionName)
+
+            if semanticCache is not None:
+                self.caches.move_to_end(collectionName)
+            else:
+                semanticCache = SemanticCache(collectionName, self.getClient(), self.executor, self.ttl, self.embeddingFunction, self.exactMatchCache, self.backend == 'http', self.getCollectionStats(collectionName))
+                self.caches[collectionName] = semanticCache
+
+                # 가장 오래 사용되지 않은 핸들부터 제거
+                while len(self.caches) > self.maxCollections:
+                    evictedName, _ = self.caches.popitem(last=False)
+                    print('SemanticCacheRegistry.getSemanticCache().evicted:', evictedName)
+
+            return semanticCache
+
+    async def agetSemanticCache(self, collectionName='default_collection'):
+        """이벤트 루프에서 사용하는 getSemanticCache(). 새 핸들을 만들 때의 create_collection(SQLite I/O 또는 HTTP 요청)은 executor에서 실행합니다."""
+        with self.lock:
+            semanticCache = self.caches.get(collectionName)
+            if semanticCache is not None:
+                self.caches.move_to_end(collectionName)
+                return semanticCache
+
+        return await self.executor.run('create_collection', self.getSemanticCache, collectionName)
+
+    def sweepExpired(self):
+        """모든 컬렉션에서 TTL이 지난 항목을 삭제합니다."""
+        for collection in self.getClient().list_collections():
+            with self.lock:
+                semanticCache = self.caches.get(collection.name)   # LRU 순서는 바꾸지 않음
+            if semanticCache is None:
+                semanticCache = SemanticCache(collection.name, self.getClient(), self.executor, self.ttl, self.embeddingFunction, self.exactMatchCache, self.backend == 'http', self.getCollectionStats(collection.name))
+            semanticCache.deleteOldSemantics(self.ttl)
+
+        self.exactMatchCache.deleteExpired(self.ttl)
+
+    async def runSweeper(self, interval):
+        """interval(초)마다 만료된 항목을 삭제하는 백그라운드 태스크. lifespan에서 시작합니다."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.executor.run('sweep', self.sweepExpired)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print('SemanticCacheRegistry.runSweeper().error:', e)
+
+    def close(self):
+        self.executor.shutdown()
+        if hasattr(self.embeddingFunction, 'close'):
+            self.embeddingFunction.close()
+
+semanticCacheRegistry = SemanticCacheRegistry()
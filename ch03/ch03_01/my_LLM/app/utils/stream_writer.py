@@ -0,0 +1,119 @@
+import asyncio
+
+class StreamWriter:
+    """토큰을 모아 프레임 단위로 웹소켓에 전송합니다.
+
+    전송 태스크는 첫 토큰이 도착한 뒤 flushInterval(초) 동안, 또는 모인 데이터가
+    maxFrameBytes에 도달할 때까지 토큰을 모아 하나의 프레임으로 보냅니다.
+    클라이언트가 느려 send가 오래 걸리면 그 동안 도착한 토큰은 다음 프레임에 합쳐지고,
+    전송되지 않은 데이터가 maxPendingBytes를 넘으면 write()가 대기합니다(backpressure).
+    """
+    def __init__(self, ws, prefix='', flushInterval=0.03, maxFrameBytes=1024, maxPendingBytes=64*1024):
+        self.ws = ws
+        self.prefix = prefix
+        self.flushInterval = flushInterval      # seconds
+        self.maxFrameBytes = maxFrameBytes
+        self.maxPendingBytes = maxPendingBytes
+
+        self.buffer = []
+        self.pendingBytes = 0
+        self.closed = False
+        self.dataEvent = asyncio.Event()    # 버퍼에 새 데이터가 들어옴
+        self.drainEvent = asyncio.Event()   # 버퍼가 비워짐
+        self.drainEvent.set()
+        self.senderTask = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, excType, exc, tb):
+        if excType is not None and issubclass(excType, asyncio.CancelledError):
+            await self.abort()  # 취소 시 남은 데이터는 버림
+        else:
+            await self.close()  # 남은 데이터를 전송하고 종료
+
+    def start(self):
+        if self.senderTask is None:
+            self.senderTask = asyncio.create_task(self.__sendLoop())
+
+    async def write(self, text):
+        if not text:
+            return
+
+        # backpressure: 전송되지 않은 데이터가 상한을 넘으면 전송 태스크가 버퍼를 비울 때까지 대기
+        while self.pendingBytes >= self.maxPendingBytes:
+            if self.senderTask.done():
+                break
+            self.drainEvent.clear()
+            await self.drainEvent.wait()
+
+        if self.senderTask.done():
+            await self.senderTask   # 전송 태스크의 예외(예, 연결 끊김)를 호출자에게 전달
+            raise RuntimeError('StreamWriter is closed.')
+
+        self.buffer.append(text)
+        self.pendingBytes = self.pendingBytes + len(text.encode('utf-8'))
+        self.dataEvent.set()
+
+    async def close(self):
+        self.closed = True
+        self.dataEvent.set()
+
+        if self.senderTask is not None:
+            await self.senderTask
+
+    async def flush(self):
+        """버퍼에 모인 데이터를 바로 전송합니다. 이후 write()는 새 프레임에서 시작합니다."""
+        await self.close()
+
+        self.closed = False
+        self.senderTask = None
+        self.start()
+
+    async def abort(self):
+        self.closed = True
+
+        if self.senderTask is not None and not self.senderTask.done():
+            self.senderTask.cancel()
+            try:
+                await self.senderTask
+            except asyncio.CancelledError:
+                pass
+
+    async def __sendLoop(self):
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                await self.dataEvent.wait()
+
+                # 시간 예산(flushInterval)과 크기 예산(maxFrameBytes) 안에서 토큰을 모음
+                if self.buffer and not self.closed:
+                    deadline = loop.time() + self.flushInterval
+                    frameBytes = min(self.maxFrameBytes, self.maxPendingBytes)   # write()가 대기 중이면 바로 전송
+                    while self.pendingBytes < frameBytes and not self.closed:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        self.dataEvent.clear()
+                        try:
+                            await asyncio.wait_for(self.dataEvent.wait(), timeout=remaining)
+                        except asyncio.TimeoutError:
+                            break
+
+                self.dataEvent.clear()
+
+                if self.buffer:
+                    frame = ''.join(self.buffer)
+                    self.buffer = []
+                    self.pendingBytes = 0
+                    self.drainEvent.set()
+
+                    # 느린 클라이언트에서는 여기서 대기하는 동안 도착한 토큰이 다음 프레임으로 합쳐짐
+                    await self.ws.send_text('{}{}'.format(self.prefix, frame))
+
+                if self.closed and not self.buffer:
+                    break
+        finally:
+            self.drainEvent.set()   # 대기 중인 write()를 깨움
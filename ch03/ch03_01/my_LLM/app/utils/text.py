@@ -0,0 +1,9 @@
+import hashlib
+import unicodedata
+
+def normalizeText(text):
+    ''' 유니코드 NFC 정규화 후 공백을 하나로 합칩니다. '''
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+def hashText(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
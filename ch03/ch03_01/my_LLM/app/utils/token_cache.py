@@ -0,0 +1,80 @@
+import time
+import hashlib
+from collections import OrderedDict
+
+from jose import JWTError, jwt
+
+def joseDecode(token, secretKey, algorithm):
+    try:
+        return jwt.decode(token, secretKey, algorithms=[algorithm])
+    except JWTError:
+        return None
+
+def pyjwtDecode(token, secretKey, algorithm):
+    import jwt as pyjwt    # PyJWT(선택 사항): pip install pyjwt
+
+    try:
+        return pyjwt.decode(token, secretKey, algorithms=[algorithm])
+    except pyjwt.PyJWTError:
+        return None
+
+# JWT_VERIFIER 설정 값 -> 서명 검증 함수
+VERIFIERS = {
+    "jose": joseDecode
+    , "pyjwt": pyjwtDecode
+}
+
+def checkVerifier(name):
+    ''' 앱 시작 단계에서 호출. 설정 값이 잘못되었거나 필요한 패키지가 없으면 첫 요청(500)이 아니라 시작할 때 실패합니다. '''
+    if name not in VERIFIERS:
+        raise ValueError('Unknown JWT_VERIFIER: {}. Use one of {}'.format(name, list(VERIFIERS.keys())))
+
+    if name == 'pyjwt':
+        try:
+            import jwt as pyjwt
+        except ImportError as e:
+            raise ImportError('JWT_VERIFIER "pyjwt" requires PyJWT: pip install pyjwt') from e
+
+        if not hasattr(pyjwt, 'PyJWTError'):
+            raise ImportError('JWT_VERIFIER "pyjwt" requires PyJWT, but another "jwt" package is installed: {}'.format(pyjwt.__file__))
+
+class VerifiedTokenCache():
+    ''' 서명 검증을 마친 토큰(해시)과 디코딩한 payload를 저장하는 LRU. "exp"가 지난 토큰은 반환하지 않습니다. '''
+    def __init__(self, maxSize=10000):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()    # token hash -> payload
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def tokenHash(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        key = self.tokenHash(token)
+        payload = self.entries.get(key)
+
+        if payload is not None and payload.get("exp", 0) <= time.time():
+            del self.entries[key]   # 만료된 토큰
+            payload = None
+
+        if payload is None:
+            self.misses = self.misses + 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits = self.hits + 1
+        return dict(payload)
+
+    def put(self, token, payload):
+        key = self.tokenHash(token)
+        self.entries[key] = dict(payload)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def getStats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict
+
+class LocalInvalidationChannel():
+    ''' 워커 간 캐시 무효화 채널의 로컬 대체 구현(같은 프로세스 안에서만 전달).
+
+    여러 워커 프로세스를 쓰는 경우 같은 publish()/subscribe() 인터페이스로
+    Redis pub/sub 등을 구현하여 UserInfoCache에 전달하면 됩니다.
+    '''
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def publish(self, message):
+        for callback in self.subscribers:
+            callback(message)
+
+class UserInfoCache():
+    ''' user_info 행을 id와 username으로 조회하는 크기 제한 TTL 캐시(read-through).
+
+    한 사용자 행은 id를 키로 하는 LRU 항목 하나에 저장하고, username -> id 색인을 함께 둡니다.
+    두 키가 같은 항목을 가리키므로 어느 쪽으로 조회해도 같은 LRU 순서가 갱신되고, 축출/무효화도 함께 됩니다.
+    '''
+    def __init__(self, maxSize=10000, ttl=300, channel=None):
+        self.maxSize = maxSize
+        self.ttl = ttl  # seconds
+        self.entries = OrderedDict()    # id -> (userInfo, expireTime)
+        self.ids = {}   # username -> id
+        self.channel = channel
+
+        if self.channel is not None:
+            self.channel.subscribe(self.__onInvalidate)
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+
+    def __remove(self, id):
+        entry = self.entries.pop(id, None)
+
+        if entry is not None and self.ids.get(entry[0]["username"]) == id:
+            del self.ids[entry[0]["username"]]
+
+        return entry
+
+    def __get(self, id):
+        entry = self.entries.get(id) if id is not None else None
+
+        if entry is not None and entry[1] < time.monotonic():
+            self.__remove(id)   # 만료
+            entry = None
+
+        if entry is None:
+            self.misses = self.misses + 1
+            return None
+
+        self.entries.move_to_end(id)
+        self.hits = self.hits + 1
+        return entry[0]
+
+    def getById(self, id):
+        return self.__get(id)
+
+    def getByName(self, username):
+        return self.__get(self.ids.get(username))
+
+    def put(self, userInfo):
+        id = userInfo["id"]
+        username = userInfo["username"]
+
+        # 같은 id의 이전 행(username 변경)이나 같은 username의 이전 행(삭제 후 재가입)을 먼저 제거
+        self.__remove(id)
+        if username in self.ids:
+            self.__remove(self.ids[username])
+
+        self.entries[id] = (userInfo, time.monotonic() + self.ttl)
+        self.ids[username] = id
+
+        while len(self.entries) > self.maxSize:
+            self.__remove(next(iter(self.entries)))
+
+    def __invalidateLocal(self, id=None, username=None):
+        if id is not None:
+            self.__remove(id)
+
+        if username is not None and username in self.ids:
+            self.__remove(self.ids[username])
+
+    def invalidate(self, id=None, username=None):
+        self.__invalidateLocal(id, username)
+
+        # 다른 워커의 캐시도 무효화
+        if self.channel is not None:
+            self.channel.publish({"id": id, "username": username})
+
+    def __onInvalidate(self, message):
+        self.__invalidateLocal(message.get("id"), message.get("username"))
+
+    def getStats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
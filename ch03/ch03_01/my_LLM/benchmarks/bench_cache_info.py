@@ -0,0 +1,70 @@
+# SemanticCache.getCollectionInfo() 비용 측정
+# 컬렉션 크기(1k, 10k, 100k)에 따라 전체 get() 방식과 증분 통계 방식의 호출 시간을 비교합니다.
+#
+# 실행: my_LLM 디렉터리에서
+# python benchmarks/bench_cache_info.py
+
+import io
+import os
+import sys
+import time
+import tempfile
+import contextlib
+
+import numpy as np
+from chromadb import PersistentClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.semantic_cache import SemanticCache, SemanticCacheExecutor
+
+SIZES = [1000, 10000, 100000]
+BATCH_SIZE = 5000
+EMBEDDING_DIM = 384     # Chroma 기본 임베딩 함수(all-MiniLM-L6-v2)의 차원
+REPEAT = 100
+
+def populate(collection, size):
+    ''' 임베딩 계산 비용을 빼기 위해 임의의 임베딩으로 항목을 추가합니다. '''
+    now = int(time.time())
+    rng = np.random.default_rng(0)
+
+    for start in range(0, size, BATCH_SIZE):
+        end = min(start + BATCH_SIZE, size)
+        ids = ['query {}'.format(i) for i in range(start, end)]
+        collection.add(
+            ids=ids
+            , documents=ids
+            , metadatas=[{"response": 'response {}'.format(i), "timestamp": now - i} for i in range(start, end)]
+            , embeddings=rng.random((end - start, EMBEDDING_DIM), dtype=np.float32)
+        )
+
+def timeCall(func, repeat):
+    with contextlib.redirect_stdout(io.StringIO()):   # getCollectionInfo()의 print 출력을 숨김
+        startTime = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        endTime = time.perf_counter()
+
+    return (endTime - startTime) / repeat
+
+if __name__ == "__main__":
+    executor = SemanticCacheExecutor()
+
+    with tempfile.TemporaryDirectory() as path:
+        client = PersistentClient(path=path)
+
+        print('{:>8} {:>16} {:>16} {:>16}'.format('entries', 'full get() (ms)', 'first info (ms)', 'info (ms)'))
+        for size in SIZES:
+            name = 'bench_{}'.format(size)
+            populate(client.create_collection(name=name), size)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                semanticCache = SemanticCache(name, client, executor)
+
+            fullGet = timeCall(semanticCache.semanticCache.get, 1)  # 이전 방식: 전체 문서와 메타데이터를 읽음
+            firstInfo = timeCall(semanticCache.getCollectionInfo, 1)  # 핸들당 한 번: 통계 계산
+            info = timeCall(semanticCache.getCollectionInfo, REPEAT)  # 이후: 증분 통계 사용
+
+            print('{:>8} {:>16.3f} {:>16.3f} {:>16.4f}'.format(size, fullGet*1000, firstInfo*1000, info*1000))
+
+    executor.shutdown()
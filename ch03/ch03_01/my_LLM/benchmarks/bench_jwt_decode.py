@@ -0,0 +1,57 @@
+# 액세스 토큰 디코딩 비용 측정
+# python-jose, PyJWT(설치된 경우)의 서명 검증과 검증 결과 캐시(VerifiedTokenCache) 조회를 비교합니다.
+#
+# 실행: my_LLM 디렉터리에서
+# python benchmarks/bench_jwt_decode.py
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from jose import jwt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.token_cache import VERIFIERS, VerifiedTokenCache
+
+SECRET_KEY = 'benchmark-secret'
+ALGORITHM = 'HS256'
+REPEAT = 10000
+
+def timeCall(func, repeat):
+    startTime = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    endTime = time.perf_counter()
+
+    return (endTime - startTime) / repeat
+
+if __name__ == "__main__":
+    payload = {
+        "id": 1
+        , "username": 'user@example.com'
+        , "picture": None
+        , "last_login_at": None
+        , "exp": datetime.now(timezone.utc) + timedelta(hours=1)
+    }
+    token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+    for name, verifyToken in VERIFIERS.items():
+        try:
+            verifyToken(token, SECRET_KEY, ALGORITHM)
+        except ImportError:
+            print('{:>12}: not installed'.format(name))
+            continue
+
+        elapsed = timeCall(lambda: verifyToken(token, SECRET_KEY, ALGORITHM), REPEAT)
+        print('{:>12}: {:>8.2f} us/decode'.format(name, elapsed * 1e6))
+
+    tokenCache = VerifiedTokenCache()
+    tokenCache.put(token, VERIFIERS["jose"](token, SECRET_KEY, ALGORITHM))
+    elapsed = timeCall(lambda: tokenCache.get(token), REPEAT)
+    print('{:>12}: {:>8.2f} us/decode'.format('cached', elapsed * 1e6))
+
+    tokens = {token: payload}
+    elapsed = timeCall(lambda: tokens.get(token), REPEAT)
+    print('{:>12}: {:>8.2f} us/lookup'.format('dict lookup', elapsed * 1e6))
@@ -0,0 +1,52 @@
+# 로그인(bcrypt 검증) 처리량 측정
+# 이벤트 루프에서 직접 검증하는 경우와 CryptoPool(프로세스 풀)의 워커 수를 바꿔 가며 초당 검증 수를 비교합니다.
+#
+# 실행: my_LLM 디렉터리에서
+# python benchmarks/bench_login_throughput.py
+
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.crypto import CryptoPool, encrypt, verify
+
+ROUNDS = 12
+LOGINS = 64
+
+async def syncLogins(hashed):
+    ''' 이전 방식: 이벤트 루프에서 bcrypt를 직접 실행 '''
+    async def login():
+        return verify('password', hashed)
+
+    await asyncio.gather(*[login() for _ in range(LOGINS)])
+
+async def poolLogins(cryptoPool, hashed):
+    await asyncio.gather(*[cryptoPool.verify('password', hashed) for _ in range(LOGINS)])
+
+async def main():
+    hashed = encrypt('password', ROUNDS)
+
+    startTime = time.perf_counter()
+    await syncLogins(hashed)
+    elapsed = time.perf_counter() - startTime
+    print('{:>12} {:>10.1f} logins/s'.format('event loop', LOGINS / elapsed))
+
+    cpuCount = os.cpu_count() or 1
+    workerCounts = sorted({1, 2, 4, 8, cpuCount} & set(range(1, cpuCount + 1)))
+
+    for workers in workerCounts:
+        cryptoPool = CryptoPool(maxWorkers=workers, maxQueueSize=LOGINS, rounds=ROUNDS)
+        await cryptoPool.verify('password', hashed)     # 워커 프로세스 시작 비용 제외
+
+        startTime = time.perf_counter()
+        await poolLogins(cryptoPool, hashed)
+        elapsed = time.perf_counter() - startTime
+        print('{:>12} {:>10.1f} logins/s'.format('{} workers'.format(workers), LOGINS / elapsed))
+
+        cryptoPool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
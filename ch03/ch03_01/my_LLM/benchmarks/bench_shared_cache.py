@@ -0,0 +1,124 @@
+# 여러 워커 프로세스가 Chroma 서버 모드(SEMANTIC_CACHE_BACKEND='http')로 시맨틱 캐시를 공유할 때의 일관성 확인
+# 워커마다 같은 질의 집합을 무작위 순서로 조회하고, 없으면 추가합니다.
+# 끝난 뒤 워커별 hit 비율, 저장된 항목 수, 응답이 질의와 일치하는지(손상 여부)를 출력하고,
+# 손상된 항목이나 잘못된 응답이 있거나 저장된 항목 수가 질의 수를 넘으면 실패(exit code 1)합니다.
+#
+# 실행: my_LLM 디렉터리에서 (chromadb 패키지의 chroma CLI 필요)
+# python benchmarks/bench_shared_cache.py
+
+import io
+import os
+import sys
+import time
+import random
+import hashlib
+import tempfile
+import subprocess
+import contextlib
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKERS = 4
+QUERIES = 200       # 서로 다른 질의 수
+LOOKUPS = 1000      # 워커당 조회 수
+PORT = 8011
+COLLECTION = 'shared_cache_check'
+
+def hashEmbedding(texts):
+    ''' 모델 다운로드 없이 실행하기 위한 결정적(deterministic) 임베딩 '''
+    return [[byte / 255 for byte in hashlib.sha256(text.encode('utf-8')).digest()] for text in texts]
+
+def responseFor(query):
+    return 'response for {}'.format(query)
+
+def worker(workerId, results):
+    from app.utils.semantic_cache import SemanticCacheRegistry
+    from app.utils.embedding import BatchedEmbeddingFunction
+
+    registry = SemanticCacheRegistry(embeddingFunction=BatchedEmbeddingFunction(hashEmbedding))
+    registry.backend = 'http'
+    registry.port = PORT
+
+    rng = random.Random(workerId)
+    hits = 0
+    wrong = 0
+
+    with contextlib.redirect_stdout(io.StringIO()):     # SemanticCache의 print 출력을 숨김
+        semanticCache = registry.getSemanticCache(COLLECTION)
+
+        for _ in range(LOOKUPS):
+            query = 'query {}'.format(rng.randrange(QUERIES))
+            value = semanticCache.queryToCache(query)
+
+            if value is not None and value["distance"] == 0:
+                hits = hits + 1
+                if value["response"] != responseFor(query):
+                    wrong = wrong + 1
+            else:
+                semanticCache.addToCache(query, responseFor(query))
+
+    registry.close()
+    results.put((workerId, hits, wrong))
+
+def workerProcessesOk(processes):
+    return all(process.exitcode == 0 for process in processes)
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as path:
+        server = subprocess.Popen(
+            ['chroma', 'run', '--path', path, '--port', str(PORT)]
+            , stdout=subprocess.DEVNULL
+            , stderr=subprocess.DEVNULL
+        )
+
+        try:
+            from chromadb import HttpClient
+
+            for _ in range(50):     # 서버 시작 대기
+                try:
+                    client = HttpClient(host='localhost', port=PORT)
+                    client.heartbeat()
+                    break
+                except Exception:
+                    time.sleep(0.2)
+
+            results = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=worker, args=(i, results)) for i in range(WORKERS)]
+            startTime = time.time()
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            elapsed = time.time() - startTime
+
+            # 실패한 워커는 결과를 보내지 않으므로 결과를 기다리기 전에 확인
+            assert workerProcessesOk(processes), 'worker process failed: exit codes {}'.format([process.exitcode for process in processes])
+
+            totalWrong = 0
+            for _ in range(WORKERS):
+                workerId, hits, wrong = results.get()
+                totalWrong = totalWrong + wrong
+                print('worker {}: hit ratio {:.3f}, wrong responses {}'.format(workerId, hits / LOOKUPS, wrong))
+
+            collection = client.get_collection(COLLECTION)
+            stored = collection.get(include=["metadatas"])
+            corrupted = [id for id, metadata in zip(stored["ids"], stored["metadatas"]) if metadata["response"] != responseFor(id)]
+
+            print('stored entries: {} (expected <= {}), corrupted: {}, elapsedTime: {:.1f}s'.format(
+                collection.count(), QUERIES, len(corrupted), elapsed))
+
+            # shared 모드의 getCollectionInfo()는 전체를 다시 읽지 않고 서버의 항목 수를 반환
+            from app.utils.semantic_cache import SemanticCache
+            with contextlib.redirect_stdout(io.StringIO()):
+                info = SemanticCache(COLLECTION, client, shared=True).getCollectionInfo()
+            print('getCollectionInfo().total_records:', info["total_records"])
+
+            assert totalWrong == 0, '{} wrong responses'.format(totalWrong)
+            assert len(corrupted) == 0, 'corrupted entries: {}'.format(corrupted[:10])
+            assert 0 < collection.count() <= QUERIES, 'stored entries out of bounds: {}'.format(collection.count())
+            assert info["total_records"] == collection.count()
+            print('OK')
+        finally:
+            server.terminate()
+            server.wait()
@@ -0,0 +1,21 @@
+# CryptoPool 워커 프로세스에서 실행되는 bcrypt 함수
+# spawn으로 만든 워커는 작업 함수가 정의된 모듈을 import 하므로, app 패키지(설정 파일, FastAPI, chromadb 등)를
+# 읽지 않도록 bcrypt만 사용하는 별도 최상위 모듈에 둡니다. app 패키지를 import 하지 마세요.
+
+import bcrypt
+
+def encrypt(secret, rounds=12):
+    secretBytes = secret.encode('utf-8')
+    salt = bcrypt.gensalt(rounds=rounds)
+    hashedSecret = bcrypt.hashpw(secretBytes, salt)
+
+    return hashedSecret.decode('utf-8')
+
+def verify(secret, hashed):
+    secretBytes = secret.encode('utf-8')
+    hashedBytes = hashed.encode('utf-8')
+
+    return bcrypt.checkpw(secretBytes, hashedBytes)
+
+def encryptBatch(secrets, rounds=12):
+    return [encrypt(secret, rounds) for secret in secrets]
@@ -0,0 +1,72 @@
+# 사용자 일괄 등록
+# CSV(헤더: username,password) 또는 JSON([{"username": ..., "password": ...}, ...]) 파일의 사용자를 등록합니다.
+#
+# 실행: my_LLM 디렉터리에서
+# python import_users.py users.csv
+# python import_users.py users.json --chunk-size 2000 --report conflicts.json
+
+import csv
+import json
+import time
+import asyncio
+import argparse
+
+def readUsers(filePath):
+    if filePath.endswith('.json'):
+        with open(filePath, encoding='utf-8') as fp:
+            return json.load(fp)
+    else:
+        with open(filePath, newline='', encoding='utf-8') as fp:
+            return list(csv.DictReader(fp))
+
+async def main(args):
+    # spawn으로 만든 CryptoPool 워커는 이 모듈을 다시 import 하므로, app 패키지는 여기서 읽음
+    import app as myLLM
+    from app import appCfg
+    from app.utils.db import queryRegistry
+
+    users = readUsers(args.file)
+    print('import_users.py.main().users:', len(users))
+
+    queryRegistry.load()
+    await myLLM.createConnectionPool(
+        appCfg.DB_HOST
+        , appCfg.DB_PORT
+        , appCfg.DB_USER
+        , appCfg.DB_PASSWORD
+        , appCfg.DB
+        , appCfg.DB_POOL_MINSIZE
+        , appCfg.DB_POOL_MAXSIZE
+        , appCfg.DB_POOL_RECYCLE
+        , appCfg.DB_CONNECT_TIMEOUT
+    )
+    myLLM.createCryptoPool(appCfg.CRYPTO_POOL_WORKERS, appCfg.CRYPTO_POOL_MAX_QUEUE, appCfg.BCRYPT_ROUNDS)
+    myLLM.createUserCache(appCfg.USER_CACHE_SIZE, appCfg.USER_CACHE_TTL)
+    myLLM.createTokenCache(appCfg.TOKEN_CACHE_SIZE)
+
+    from app.services.user import User
+
+    try:
+        startTime = time.time()
+        result = await User().createUsers(users, args.chunk_size)
+        endTime = time.time()
+    finally:
+        myLLM.deleteCryptoPool()
+        await myLLM.deleteConnectionPool()
+
+    print('created: {}, conflicts: {}, elapsedTime: {:.1f}s'.format(result["created"], len(result["conflicts"]), endTime - startTime))
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as fp:
+            json.dump(result["conflicts"], fp, ensure_ascii=False, indent=2)
+    else:
+        for conflict in result["conflicts"]:
+            print('row {}: {} ({})'.format(conflict["row"], conflict["username"], conflict["reason"]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bulk user import')
+    parser.add_argument('file', help='CSV(username,password) or JSON file')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='rows per transaction')
+    parser.add_argument('--report', help='write per-row conflicts to this JSON file')
+
+    asyncio.run(main(parser.parse_args()))
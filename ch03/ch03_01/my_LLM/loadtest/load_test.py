@@ -0,0 +1,121 @@
+# /chat 웹소켓 부하 테스트
+# N개의 웹소켓 클라이언트가 동시에 auth, chat 메시지를 보내고 다음 값을 측정합니다.
+# - TTFT: chat 전송부터 첫 'Assistant: ' 프레임까지의 시간
+# - tokens/s: 응답 단어 수 / (첫 프레임부터 '--- Full Response' 까지의 시간)
+# - 턴 지연 시간: chat 전송부터 '--- Full Response' 까지의 시간 (p50, p99)
+# - 캐시 hit 비율: 1 - (mock LLM 서버가 받은 요청 수 / 전체 턴 수). single-flight로 합쳐진 요청도 포함됩니다.
+# - 서버 CPU: --server-pid로 지정한 앱 프로세스의 CPU 사용률
+#
+# 실행: my_LLM 디렉터리에서
+# python loadtest/mock_llm_server.py &
+# python run.py &
+# python loadtest/load_test.py --clients 50 --turns 5 --server-pid <run.py PID>
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+import urllib.request
+
+import websockets
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))
+    return values[index]
+
+def getMockStats(mockUrl):
+    with urllib.request.urlopen('{}/stats'.format(mockUrl)) as resp:
+        return json.loads(resp.read())
+
+def readCpuTime(pid):
+    ''' 프로세스의 CPU 시간(user + system, seconds). psutil이 없으면 /proc(Linux)에서 읽음 '''
+    try:
+        import psutil
+        times = psutil.Process(pid).cpu_times()
+        return times.user + times.system
+    except ImportError:
+        import os
+        with open('/proc/{}/stat'.format(pid)) as fp:
+            fields = fp.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+async def runClient(clientId, args, prompts, results):
+    async with websockets.connect(args.url, max_size=None) as ws:
+        await ws.recv()     # 'Server: Welcome to the chat!'
+        await ws.send(json.dumps({"type": 'auth', "message": args.token}))
+
+        for _ in range(args.turns):
+            prompt = random.choice(prompts)
+            startTime = time.perf_counter()
+            firstFrameTime = None
+            words = 0
+            error = False
+
+            await ws.send(json.dumps({"type": 'chat', "message": prompt}))
+
+            while True:
+                frame = await ws.recv()
+                if frame.startswith('Assistant: '):
+                    if firstFrameTime is None:
+                        firstFrameTime = time.perf_counter()
+                    words = words + len(frame[len('Assistant: '):].split())
+                elif frame.startswith('--- Full Response:'):
+                    break
+                elif frame.startswith('Error:'):
+                    error = True
+
+            endTime = time.perf_counter()
+
+            results.append({
+                "ttft": (firstFrameTime or endTime) - startTime
+                , "latency": endTime - startTime
+                , "tokens_per_second": words / (endTime - firstFrameTime) if firstFrameTime and endTime > firstFrameTime else 0.0
+                , "error": error
+            })
+
+async def main(args):
+    # 같은 질문이 반복되도록 질문 집합의 크기를 제한(캐시와 single-flight 경로 확인)
+    prompts = ['부하 테스트 질문 {}번에 답해 주세요.'.format(i) for i in range(args.prompts)]
+    results = []
+
+    mockBefore = getMockStats(args.mock_url)
+    cpuBefore = readCpuTime(args.server_pid) if args.server_pid else None
+    startTime = time.perf_counter()
+
+    await asyncio.gather(*[runClient(i, args, prompts, results) for i in range(args.clients)])
+
+    elapsed = time.perf_counter() - startTime
+    cpuAfter = readCpuTime(args.server_pid) if args.server_pid else None
+    mockAfter = getMockStats(args.mock_url)
+
+    turns = len(results)
+    llmRequests = mockAfter["requests"] - mockBefore["requests"]
+    ttfts = [result["ttft"] for result in results]
+    latencies = [result["latency"] for result in results]
+    rates = [result["tokens_per_second"] for result in results if result["tokens_per_second"] > 0]
+
+    print('clients: {}, turns: {}, elapsedTime: {:.1f}s, errors: {}'.format(
+        args.clients, turns, elapsed, sum(1 for result in results if result["error"])))
+    print('TTFT          p50: {:.3f}s, p99: {:.3f}s'.format(percentile(ttfts, 50), percentile(ttfts, 99)))
+    print('turn latency  p50: {:.3f}s, p99: {:.3f}s'.format(percentile(latencies, 50), percentile(latencies, 99)))
+    print('tokens/s      mean: {:.1f}'.format(statistics.mean(rates) if rates else 0.0))
+    print('cache hit ratio: {:.3f} (LLM requests: {})'.format(1 - llmRequests / turns if turns else 0.0, llmRequests))
+    if cpuBefore is not None:
+        print('server CPU: {:.1f}%'.format((cpuAfter - cpuBefore) / elapsed * 100))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load test for the /chat websocket')
+    parser.add_argument('--url', default='ws://localhost:8000/chat')
+    parser.add_argument('--mock-url', default='http://localhost:8080', help='mock LLM server (for request counts)')
+    parser.add_argument('--clients', type=int, default=20, help='concurrent websocket clients')
+    parser.add_argument('--turns', type=int, default=5, help='chat messages per client')
+    parser.add_argument('--prompts', type=int, default=20, help='distinct prompts')
+    parser.add_argument('--token', default=None, help='access token for the auth message (default collection if omitted)')
+    parser.add_argument('--server-pid', type=int, default=None, help='app process id for CPU usage')
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,111 @@
+# 부하 테스트용 OpenAI 호환 LLM 서버(mock)
+# chat_routes가 사용하는 localhost:8080의 /v1/chat/completions를 흉내 냅니다.
+# 첫 토큰까지의 지연(TTFT), 초당 토큰 수, 오류 주입 비율을 설정할 수 있습니다.
+#
+# 실행: my_LLM 디렉터리에서
+# python loadtest/mock_llm_server.py --ttft 0.3 --token-rate 30 --tokens 200 --error-rate 0.01
+
+import json
+import time
+import random
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+mockApp = FastAPI()
+
+settings = {
+    "ttft": 0.3                 # seconds
+    , "token_rate": 30.0        # tokens/s
+    , "tokens": 200             # 응답당 토큰 수
+    , "error_rate": 0.0         # 요청을 500으로 거절하는 비율
+    , "stream_error_rate": 0.0  # 스트리밍 도중 연결을 끊는 비율
+}
+
+stats = {"requests": 0, "errors": 0, "stream_errors": 0, "active_streams": 0}
+
+def makeChunk(completionId, modelName, content, finishReason=None):
+    return {
+        "id": completionId
+        , "object": 'chat.completion.chunk'
+        , "created": int(time.time())
+        , "model": modelName
+        , "choices": [{
+            "index": 0
+            , "delta": {"content": content} if content is not None else {}
+            , "finish_reason": finishReason
+        }]
+    }
+
+async def streamTokens(completionId, modelName):
+    stats["active_streams"] = stats["active_streams"] + 1
+    try:
+        await asyncio.sleep(settings["ttft"])
+        breakAt = random.randrange(settings["tokens"]) if random.random() < settings["stream_error_rate"] else None
+
+        for i in range(settings["tokens"]):
+            if i == breakAt:
+                stats["stream_errors"] = stats["stream_errors"] + 1
+                raise RuntimeError('injected stream error')
+
+            yield 'data: {}\n\n'.format(json.dumps(makeChunk(completionId, modelName, '토큰{} '.format(i)), ensure_ascii=False))
+            await asyncio.sleep(1 / settings["token_rate"])
+
+        yield 'data: {}\n\n'.format(json.dumps(makeChunk(completionId, modelName, None, 'stop')))
+        yield 'data: [DONE]\n\n'
+    finally:
+        stats["active_streams"] = stats["active_streams"] - 1
+
+@mockApp.post('/v1/chat/completions')
+async def chatCompletions(request: Request):
+    body = await request.json()
+    stats["requests"] = stats["requests"] + 1
+
+    if random.random() < settings["error_rate"]:
+        stats["errors"] = stats["errors"] + 1
+        return JSONResponse(content={"error": {"message": 'injected error'}}, status_code=500)
+
+    completionId = 'chatcmpl-mock-{}'.format(stats["requests"])
+    modelName = body.get("model", 'mock')
+
+    if body.get("stream"):
+        return StreamingResponse(streamTokens(completionId, modelName), media_type='text/event-stream')
+
+    await asyncio.sleep(settings["ttft"] + settings["tokens"] / settings["token_rate"])
+    content = ''.join('토큰{} '.format(i) for i in range(settings["tokens"]))
+
+    return {
+        "id": completionId
+        , "object": 'chat.completion'
+        , "created": int(time.time())
+        , "model": modelName
+        , "choices": [{"index": 0, "message": {"role": 'assistant', "content": content}, "finish_reason": 'stop'}]
+        , "usage": {"prompt_tokens": 0, "completion_tokens": settings["tokens"], "total_tokens": settings["tokens"]}
+    }
+
+@mockApp.get('/stats')
+async def getStats():
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Mock OpenAI-compatible streaming server')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--ttft', type=float, default=settings["ttft"], help='seconds before the first token')
+    parser.add_argument('--token-rate', type=float, default=settings["token_rate"], help='tokens per second')
+    parser.add_argument('--tokens', type=int, default=settings["tokens"], help='tokens per response')
+    parser.add_argument('--error-rate', type=float, default=settings["error_rate"], help='ratio of requests answered with 500')
+    parser.add_argument('--stream-error-rate', type=float, default=settings["stream_error_rate"], help='ratio of streams cut midway')
+    args = parser.parse_args()
+
+    settings.update({
+        "ttft": args.ttft
+        , "token_rate": args.token_rate
+        , "tokens": args.tokens
+        , "error_rate": args.error_rate
+        , "stream_error_rate": args.stream_error_rate
+    })
+
+    uvicorn.run(mockApp, host="0.0.0.0", reload=False, port=args.port)
@@ -1,5 +1,25 @@
-from app import app
+import os
+import tempfile
+
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", reload=False, port=8000)
+    # spawn으로 만든 워커 프로세스(CryptoPool 등)는 이 모듈을 다시 import 하므로, app 패키지는 여기서만 읽음
+    from app import app, appCfg
+
+    workers = appCfg.WORKERS
+
+    # 내장(embedded) Chroma는 한 프로세스만 저장소를 열어야 함
+    if workers > 1 and appCfg.SEMANTIC_CACHE_BACKEND != 'http':
+        print('run.py: SEMANTIC_CACHE_BACKEND must be "http" to run {} workers. Starting 1 worker.'.format(workers))
+        workers = 1
+
+    if workers > 1:
+        # 워커별 지표를 /metrics에서 합칠 수 있도록 멀티프로세스 모드로 실행(워커가 prometheus_client를 import 하기 전에 설정)
+        if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='my_llm_metrics_')
+        print('run.py: PROMETHEUS_MULTIPROC_DIR:', os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+        uvicorn.run("app:app", host="0.0.0.0", reload=False, port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", reload=False, port=8000)
@@ -0,0 +1,18 @@
+# my_LLM 테스트 공통 설정
+# app 패키지는 import 시 현재 디렉터리의 config.json을 읽으므로, 테스트용 설정 파일이 있는 임시 디렉터리에서 실행합니다.
+#
+# 실행: my_LLM 디렉터리에서
+# python -m pytest -q tests
+
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+testConfigDir = tempfile.mkdtemp(prefix='my_llm_test_')
+with open(os.path.join(testConfigDir, 'config.json'), 'w') as configFile:
+    json.dump({"JWT_SECRET": 'test-secret', "JWT_ALGORITHM": 'HS256'}, configFile)
+
+os.chdir(testConfigDir)
@@ -0,0 +1,34 @@
+# /admin/db/pool은 관리자(user_info.privilege) 액세스 토큰이 있어야 접근할 수 있는지 확인
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.user import User
+from app.api.routes.admin_routes import adminRouter
+
+USERS = {
+    "admin-token": {"id": 1, "username": 'admin@example.com', "privilege": 1}
+    , "user-token": {"id": 2, "username": 'user@example.com', "privilege": 0}
+}
+
+class FakeUserService:
+    def decodeAccessToken(self, token):
+        userInfo = USERS.get(token)
+        return {"id": userInfo["id"], "username": userInfo["username"]} if userInfo is not None else None
+
+    async def getUserInfoById(self, id):
+        return next((userInfo for userInfo in USERS.values() if userInfo["id"] == id), None)
+
+def makeClient():
+    testApp = FastAPI()
+    testApp.include_router(adminRouter)
+    testApp.dependency_overrides[User] = FakeUserService
+    return TestClient(testApp)
+
+def test_pool_stats_require_admin_token():
+    client = makeClient()
+
+    assert client.get('/admin/db/pool').status_code == 401
+    assert client.get('/admin/db/pool', headers={"Authorization": 'Bearer invalid-token'}).status_code == 401
+    assert client.get('/admin/db/pool', headers={"Authorization": 'Bearer user-token'}).status_code == 403
+    assert client.get('/admin/db/pool', headers={"Authorization": 'Bearer admin-token'}).status_code == 200
@@ -0,0 +1,64 @@
+# 긴 LLM 스트림을 asyncSendChunk()로 전송하는 동안 다른 연결(코루틴)의 지연이 늘어나지 않는지 확인
+
+import time
+import asyncio
+from types import SimpleNamespace
+
+from app.api.routes.chat_routes import asyncSendChunk
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, text):
+        self.frames.append(text)
+
+def makeChunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+async def slowStream(tokens, interval):
+    ''' 토큰을 interval(초)마다 하나씩 보내는 LLM 스트림 '''
+    for i in range(tokens):
+        await asyncio.sleep(interval)
+        yield makeChunk('토큰{} '.format(i))
+
+async def measureLateness(duration, interval=0.01):
+    ''' interval마다 깨어나며 예정보다 늦게 깨어난 최대 시간(이벤트 루프 지연)을 측정 '''
+    loop = asyncio.get_running_loop()
+    maxLateness = 0.0
+    endTime = loop.time() + duration
+
+    while loop.time() < endTime:
+        startTime = loop.time()
+        await asyncio.sleep(interval)
+        maxLateness = max(maxLateness, loop.time() - startTime - interval)
+
+    return maxLateness
+
+def test_other_connections_keep_latency_during_long_stream():
+    async def main():
+        longWs = FakeWebSocket()
+        shortWs = FakeWebSocket()
+
+        longTask = asyncio.create_task(asyncSendChunk(longWs, slowStream(100, 0.01), False))   # 약 1초
+        await asyncio.sleep(0.1)
+
+        # 긴 스트림이 진행 중일 때 다른 연결의 짧은 응답과 이벤트 루프 지연을 측정
+        startTime = time.perf_counter()
+        shortResponse = await asyncSendChunk(shortWs, slowStream(5, 0.01), False)
+        shortElapsed = time.perf_counter() - startTime
+
+        maxLateness = await measureLateness(0.5)
+        assert not longTask.done()  # 측정하는 동안 긴 스트림이 계속 진행 중이어야 함
+
+        longResponse = await longTask
+
+        return shortResponse, shortElapsed, maxLateness, longResponse, longWs
+
+    shortResponse, shortElapsed, maxLateness, longResponse, longWs = asyncio.run(main())
+
+    assert shortResponse == ''.join('토큰{} '.format(i) for i in range(5))
+    assert shortElapsed < 0.5
+    assert maxLateness < 0.05
+    assert longResponse == ''.join('토큰{} '.format(i) for i in range(100))
+    assert longWs.frames[-1] == '--- Full Response: {} ---'.format(longResponse)
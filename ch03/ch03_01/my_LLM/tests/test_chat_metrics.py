@@ -0,0 +1,30 @@
+# 웹소켓이 환영 메시지 전송 중에 끊겨도 열린 연결 수 지표(chat_active_websockets)가 원래대로 돌아오는지 확인
+
+import asyncio
+
+from fastapi import WebSocketDisconnect
+from prometheus_client import REGISTRY
+
+from app.api.routes.chat_routes import chat
+
+class DisconnectedWebSocket:
+    client_state = 'CONNECTED'
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        raise WebSocketDisconnect(code=1006)
+
+def activeWebsockets():
+    return REGISTRY.get_sample_value('chat_active_websockets')
+
+def test_active_websockets_gauge_does_not_leak_on_early_disconnect():
+    before = activeWebsockets()
+
+    try:
+        asyncio.run(chat(DisconnectedWebSocket(), None))
+    except Exception:
+        pass
+
+    assert activeWebsockets() == before
@@ -0,0 +1,47 @@
+# 워커가 여러 개(PROMETHEUS_MULTIPROC_DIR 설정)일 때 /metrics가 모든 워커의 지표를 합쳐서 반환하는지 확인
+# 워커는 지표를 기록하고 종료하는 별도 프로세스로 대신합니다.
+
+import os
+import sys
+import subprocess
+
+from app.utils.metrics import generateMetrics, markProcessDead
+
+WORKER = '''
+import os
+from app.utils.metrics import LLM_COMPLETION_RETRIES, CHAT_ACTIVE_WEBSOCKETS
+LLM_COMPLETION_RETRIES.inc()
+CHAT_ACTIVE_WEBSOCKETS.inc()
+print(os.getpid())
+'''
+
+def runWorker(multiprocDir):
+    myLLMDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=multiprocDir, PYTHONPATH=myLLMDir)
+    result = subprocess.run([sys.executable, '-c', WORKER], env=env, capture_output=True, text=True, check=True)
+
+    return int(result.stdout.strip().splitlines()[-1])
+
+def sampleValue(metrics, name):
+    for line in metrics.decode('utf-8').splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[1])
+
+    return None
+
+def test_metrics_are_aggregated_across_workers(tmp_path, monkeypatch):
+    multiprocDir = str(tmp_path)
+    pids = [runWorker(multiprocDir), runWorker(multiprocDir)]
+
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', multiprocDir)
+    metrics = generateMetrics()
+
+    assert sampleValue(metrics, 'llm_completion_retries_total') == 2
+    assert sampleValue(metrics, 'chat_active_websockets') == 2
+
+    # 종료된 워커의 Gauge 값은 합산에서 제외되고, Counter는 유지됨
+    markProcessDead(pids[0])
+    metrics = generateMetrics()
+
+    assert sampleValue(metrics, 'llm_completion_retries_total') == 2
+    assert sampleValue(metrics, 'chat_active_websockets') == 1
@@ -0,0 +1,25 @@
+# 필요한 쿼리 파일이 없으면 QueryRegistry.load()(앱 시작 단계)에서 바로 실패하는지 확인
+
+import os
+import shutil
+
+import pytest
+
+from app.utils.db import QueryRegistry, QUERY_DIR, REQUIRED_QUERIES
+
+def test_load_reads_all_required_queries():
+    registry = QueryRegistry()
+    registry.load()
+
+    for fileName in REQUIRED_QUERIES:
+        assert registry.get(fileName).strip()
+
+def test_load_fails_when_required_query_is_missing(tmp_path):
+    for fileName in os.listdir(QUERY_DIR):
+        if fileName != 'get_userinfo_by_id.sql':
+            shutil.copy(os.path.join(QUERY_DIR, fileName), tmp_path)
+
+    registry = QueryRegistry(queryDir=str(tmp_path))
+
+    with pytest.raises(FileNotFoundError, match='get_userinfo_by_id.sql'):
+        registry.load()
@@ -0,0 +1,84 @@
+# 같은 컬렉션의 핸들이 여러 개일 때(LRU 제거 후 재생성, sweeper의 임시 핸들) 컬렉션 통계가 일치하는지 확인
+
+import time
+import uuid
+import hashlib
+
+import chromadb
+
+from app.utils.semantic_cache import SemanticCacheRegistry
+from app.utils.embedding import BatchedEmbeddingFunction
+
+def hashEmbedding(texts):
+    ''' 모델 다운로드 없이 실행하기 위한 결정적(deterministic) 임베딩 '''
+    return [[byte / 255 for byte in hashlib.sha256(text.encode('utf-8')).digest()] for text in texts]
+
+def makeRegistry(maxCollections):
+    registry = SemanticCacheRegistry(maxCollections=maxCollections, embeddingFunction=BatchedEmbeddingFunction(hashEmbedding))
+    registry.chromaClient = chromadb.EphemeralClient()
+    return registry
+
+def expectedBytes(entries):
+    return sum(len(query.encode('utf-8')) + len(response.encode('utf-8')) for query, response in entries)
+
+def test_stats_follow_adds_made_through_evicted_handle():
+    registry = makeRegistry(maxCollections=1)
+    collectionName = 'stats_{}'.format(uuid.uuid4().hex)
+
+    oldHandle = registry.getSemanticCache(collectionName)
+    oldHandle.addToCache('질문1', '응답1')
+    assert oldHandle.getCollectionInfo()["total_records"] == 1
+
+    registry.getSemanticCache('other_{}'.format(uuid.uuid4().hex))    # oldHandle이 LRU에서 제거됨
+    newHandle = registry.getSemanticCache(collectionName)
+    assert newHandle is not oldHandle
+    assert newHandle.getCollectionInfo()["total_records"] == 1
+
+    oldHandle.addToCache('질문2', '응답2')     # 웹소켓이 아직 사용 중인 이전 핸들로 추가
+
+    info = newHandle.getCollectionInfo()
+    assert info["total_records"] == 2
+    assert info["total_bytes"] == expectedBytes([('질문1', '응답1'), ('질문2', '응답2')])
+    assert info["total_records"] == newHandle.semanticCache.count()
+
+    registry.close()
+
+def test_sweeper_deletes_reach_live_handle_stats():
+    registry = makeRegistry(maxCollections=1)
+    collectionName = 'sweep_{}'.format(uuid.uuid4().hex)
+
+    handle = registry.getSemanticCache(collectionName)
+    handle.addToCache('오래된 질문', '오래된 응답')
+    handle.addToCache('새 질문', '새 응답')
+    assert handle.getCollectionInfo()["total_records"] == 2
+
+    # 한 항목을 만료시키고, 핸들을 LRU에서 제거하여 sweeper가 임시 핸들로 삭제하게 함
+    handle.semanticCache.update(ids=['오래된 질문'], metadatas=[{"response": '오래된 응답', "timestamp": int(time.time()) - registry.ttl - 10}])
+    registry.getSemanticCache('other_{}'.format(uuid.uuid4().hex))
+    registry.sweepExpired()
+
+    info = handle.getCollectionInfo()
+    assert info["total_records"] == 1
+    assert info["total_bytes"] == expectedBytes([('새 질문', '새 응답')])
+    assert info["total_records"] == handle.semanticCache.count()
+
+    registry.close()
+
+def test_exact_match_lookups_are_exported_as_metrics():
+    from prometheus_client import REGISTRY
+
+    def l1Lookups(result):
+        return REGISTRY.get_sample_value('semantic_cache_l1_lookups_total', {"result": result}) or 0
+
+    registry = makeRegistry(maxCollections=1)
+    handle = registry.getSemanticCache('l1_{}'.format(uuid.uuid4().hex))
+    hitsBefore, missesBefore = l1Lookups('hit'), l1Lookups('miss')
+
+    handle.queryToCache('처음 보는 질문')      # L1 miss
+    handle.addToCache('처음 보는 질문', '응답')
+    handle.queryToCache('처음 보는 질문')      # L1 hit
+
+    assert l1Lookups('hit') - hitsBefore == 1
+    assert l1Lookups('miss') - missesBefore == 1
+
+    registry.close()
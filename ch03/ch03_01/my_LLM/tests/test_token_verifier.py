@@ -0,0 +1,20 @@
+# JWT_VERIFIER 설정이 잘못되었거나 PyJWT가 없으면 첫 요청이 아니라 앱 시작 단계(checkVerifier)에서 실패하는지 확인
+
+import sys
+
+import pytest
+
+from app.utils.token_cache import checkVerifier
+
+def test_default_verifier_is_accepted():
+    checkVerifier('jose')
+
+def test_unknown_verifier_fails():
+    with pytest.raises(ValueError, match='Unknown JWT_VERIFIER'):
+        checkVerifier('josee')
+
+def test_pyjwt_verifier_fails_without_pyjwt(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'jwt', None)   # PyJWT가 설치되지 않은 환경
+
+    with pytest.raises(ImportError, match='pip install pyjwt'):
+        checkVerifier('pyjwt')
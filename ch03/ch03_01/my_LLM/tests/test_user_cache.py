@@ -0,0 +1,110 @@
+# UserInfoCache가 사용자 행을 id/username 두 키로 조회해도 하나의 항목으로 축출/무효화하는지 확인
+# 삭제된 계정이 username 캐시에 남아 로그인되지 않아야 합니다.
+
+import asyncio
+
+from app.services.user import User
+from app.utils.crypto import CryptoPool, encrypt
+from app.utils.user_cache import UserInfoCache
+
+def makeUser(id, username):
+    return {"id": id, "username": username, "password": 'hash-{}'.format(id)}
+
+def test_invalidate_by_id_removes_username_after_name_lookups():
+    cache = UserInfoCache(maxSize=4, ttl=60)
+
+    cache.put(makeUser(1, 'a'))
+    cache.put(makeUser(2, 'b'))
+    assert cache.getByName('a')["id"] == 1     # username 조회만으로도 id 항목의 LRU 순서가 갱신되어야 함
+    cache.put(makeUser(3, 'c'))
+
+    cache.invalidate(id=1)
+
+    assert cache.getByName('a') is None
+    assert cache.getById(1) is None
+
+def test_eviction_removes_both_keys():
+    cache = UserInfoCache(maxSize=2, ttl=60)
+
+    cache.put(makeUser(1, 'a'))
+    cache.put(makeUser(2, 'b'))
+    cache.getByName('a')
+    cache.put(makeUser(3, 'c'))     # 가장 오래 사용하지 않은 2('b')가 축출됨
+
+    assert cache.getById(2) is None
+    assert cache.getByName('b') is None
+    assert cache.getByName('a')["id"] == 1
+    assert cache.getStats()["size"] == 2
+
+class FakeCursor:
+    def __init__(self, users):
+        self.users = users
+        self.result = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params):
+        if query.startswith('DELETE'):
+            self.users.pop(params[0], None)
+        elif 'WHERE id=' in query:
+            self.result = self.users.get(params[0])
+        else:
+            self.result = next((user for user in self.users.values() if user["username"] == params[0]), None)
+
+    async def fetchone(self):
+        return dict(self.result) if self.result is not None else None
+
+class FakeConnection:
+    def __init__(self, users):
+        self.users = users
+
+    def cursor(self, cursorClass=None):
+        return FakeCursor(self.users)
+
+    async def commit(self):
+        pass
+
+class FakePool:
+    ''' user_info 테이블을 dict로 대신하는 DB 풀 '''
+    def __init__(self, users):
+        self.users = users
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool.users)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+def test_login_fails_after_account_is_deleted():
+    cryptoPool = CryptoPool(maxWorkers=1, rounds=4)
+    users = {id: {"id": id, "username": username, "password": encrypt('secret', 4)} for id, username in [(1, 'a'), (2, 'b'), (3, 'c')]}
+
+    userService = User()
+    userService.pool = FakePool(users)
+    userService.cryptoPool = cryptoPool
+    userService.userCache = UserInfoCache(maxSize=2, ttl=60)
+
+    async def main():
+        assert (await userService.veryfyUserByName('a', 'secret'))["id"] == 1
+        await userService.veryfyUserByName('b', 'secret')
+        assert await userService.veryfyUserByName('a', 'secret') is not None
+        await userService.veryfyUserByName('c', 'secret')
+
+        await userService.deleteUserById(1, 'a')
+
+        return await userService.veryfyUserByName('a', 'secret')
+
+    try:
+        assert asyncio.run(main()) is None
+    finally:
+        cryptoPool.shutdown()
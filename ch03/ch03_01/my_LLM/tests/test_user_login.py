@@ -0,0 +1,60 @@
+# 로그인할 때의 재해시(rehash)는 best-effort 백그라운드 작업: 재해시가 실패해도 비밀번호가 맞으면 로그인이 성공하는지 확인
+# CryptoPool은 spawn으로 만든 실제 프로세스 풀을 사용합니다.
+
+import asyncio
+
+from app.services.user import User, rehashTasks
+from app.utils.crypto import CryptoPool, encrypt
+
+class FakeUserCache:
+    def __init__(self, userInfo):
+        self.userInfo = userInfo
+
+    def getByName(self, username):
+        return self.userInfo if username == self.userInfo["username"] else None
+
+    def invalidate(self, id=None, username=None):
+        pass
+
+class FailingPool:
+    ''' 커넥션을 얻을 수 없는 DB 풀 '''
+    def acquire(self):
+        raise RuntimeError('db unavailable')
+
+def test_login_succeeds_when_rehash_fails():
+    cryptoPool = CryptoPool(maxWorkers=1, rounds=5)
+    userInfo = {"id": 1, "username": 'user@example.com', "password": encrypt('secret', 4)}    # 이전 cost factor
+
+    userService = User()
+    userService.pool = FailingPool()
+    userService.cryptoPool = cryptoPool
+    userService.userCache = FakeUserCache(userInfo)
+
+    async def main():
+        assert await userService.veryfyUserByName('user@example.com', 'secret') is userInfo
+        assert len(rehashTasks) == 1    # 재해시는 로그인 응답 뒤에 백그라운드에서 실행
+
+        await asyncio.gather(*rehashTasks)  # 실패는 작업 안에서 처리됨
+
+        assert await userService.veryfyUserByName('user@example.com', 'wrong') is None
+        assert not rehashTasks
+
+    try:
+        assert cryptoPool.needsRehash(userInfo["password"])
+        asyncio.run(main())
+    finally:
+        cryptoPool.shutdown()
+
+def test_workers_start_without_config(tmp_path, monkeypatch):
+    # 워커는 app 패키지를 import 하지 않으므로 config.json이 없는 디렉터리에서도 시작됨
+    monkeypatch.chdir(tmp_path)
+    cryptoPool = CryptoPool(maxWorkers=1, rounds=4)
+
+    async def main():
+        hashed = await cryptoPool.encrypt('secret')
+        return await cryptoPool.verify('secret', hashed)
+
+    try:
+        assert asyncio.run(main())
+    finally:
+        cryptoPool.shutdown()
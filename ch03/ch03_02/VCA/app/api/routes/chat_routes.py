@@ -5,6 +5,7 @@ from typing import Annotated
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from app import app
+from app.utils.stream_writer import StreamWriter
 
 chatRouter = APIRouter()
 
@@ -27,14 +28,28 @@ async def sendChunk(
     try:
         lines = content.splitlines(keepends=True)   # preserving \n characters
 
-        for line in lines:
-            # 취소 요청이 있는지 확인
-            try:
-                fullResponse = fullResponse + line
-                await ws.send_text(line)
-                await asyncio.sleep(0.05)
-            except asyncio.CancelledError:
-                raise  # 취소 예외를 다시 발생시켜 상위(caller task)로 전파
+        # 고정 지연 없이 전송. 코드 블록 안의 줄들만 프레임으로 모아 전송(클라이언트 속도에 맞춤)
+        # 클라이언트는 코드 블록 밖의 프레임을 각각 한 줄(div)로 표시하므로 코드 블록 밖에서는 한 줄씩 전송
+        inCodeBlock = False
+
+        async with StreamWriter(ws) as writer:
+            for line in lines:
+                # 취소 요청이 있는지 확인
+                try:
+                    fullResponse = fullResponse + line
+                    if line.startswith('```'):
+                        # 코드 블록 경계(```)는 클라이언트가 프레임 시작에서 찾으므로 별도 프레임으로 전송
+                        await writer.flush()
+                        await writer.write(line)
+                        await writer.flush()
+                        inCodeBlock = not inCodeBlock
+                    elif inCodeBlock:
+                        await writer.write(line)    # <pre><code>에 이어 붙이므로 줄바꿈이 유지됨
+                    else:
+                        await writer.write(line)
+                        await writer.flush()
+                except asyncio.CancelledError:
+                    raise  # 취소 예외를 다시 발생시켜 상위(caller task)로 전파
     except Exception as stream_error:
         print('chat_routes.py.sendChunk().stream_error:', stream_error)
         await ws.send_text('Error: Response generation was interrupted.')